@@ -0,0 +1,221 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, QBuffer, QByteArray, QIODevice, pyqtSignal
+from lazyImport import lazyImport
+from instrumentation import timed
+
+try:
+    from PyQt5.QtMultimedia import QAudio, QAudioDeviceInfo, QAudioFormat, QAudioOutput
+    HAS_QT_MULTIMEDIA = True
+except ImportError:
+    HAS_QT_MULTIMEDIA = False
+
+# Imported on first use, off the startup path (importing pydub probes for ffmpeg)
+pydub = lazyImport('pydub')
+
+# Without QtMultimedia, playback goes through simpleaudio, whose play objects can be stopped
+simpleaudio = lazyImport('simpleaudio')
+
+
+# Path of the raw PCM sidecar of an mp3
+def wavSidecarPath(path):
+    return os.path.splitext(path)[0] + '.wav'
+
+
+# Transcode an mp3 into its WAV sidecar, so playback never needs ffmpeg
+def writeWavSidecar(path, segment=None):
+    if segment is None:
+        segment = pydub.AudioSegment.from_file(path)
+
+    # Write to a temporary file first so a crash never leaves a partial sidecar
+    wavPath = wavSidecarPath(path)
+    segment.export(wavPath + '.tmp', format='wav')
+    os.replace(wavPath + '.tmp', wavPath)
+    return segment
+
+
+# Bounded cache of decoded AudioSegments, keyed by path and mtime
+class AudioCache:
+    def __init__(self, maxEntries=8):
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def key(self, path):
+        return (os.path.abspath(path), os.stat(path).st_mtime_ns)
+
+    # The decoded segment if it is already cached, without decoding
+    def cached(self, path):
+        try:
+            key = self.key(path)
+        except OSError:
+            return None
+
+        with self.lock:
+            segment = self.entries.get(key)
+            if segment is not None:
+                self.entries.move_to_end(key)
+            return segment
+
+    # The decoded segment, decoding it if needed (call off the GUI thread)
+    def get(self, path):
+        segment = self.cached(path)
+        if segment is not None:
+            return segment
+
+        key = self.key(path)
+        wavPath = wavSidecarPath(path)
+        with timed('audioLoad'):
+            if os.path.exists(wavPath) and os.stat(wavPath).st_mtime_ns >= key[1]:
+                # The WAV sidecar is read natively by pydub, without starting ffmpeg
+                segment = pydub.AudioSegment.from_wav(wavPath)
+            else:
+                # No sidecar yet (content added before sidecars existed): decode once and write it
+                segment = pydub.AudioSegment.from_file(path)
+                try:
+                    writeWavSidecar(path, segment)
+                except OSError as e:
+                    print("Could not write audio sidecar:", wavPath, e)
+
+        with self.lock:
+            self.entries[key] = segment
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+
+        return segment
+
+
+# Plays feedback audio without blocking the Qt event loop
+# - decoding runs on a worker thread
+# - playback runs through QAudioOutput (or a simpleaudio play object without QtMultimedia)
+# - the decoded segment is kept, so replay never decodes again
+class AudioPlayer(QObject):
+    decoded = pyqtSignal(str, object)
+
+    def __init__(self, audioCache, parent=None):
+        super().__init__(parent)
+
+        # Decoded segments shared with the prefetch thread
+        self.audioCache = audioCache
+
+        # The decoded segment that play() plays
+        self.segment = None
+
+        # Path being decoded, and whether to play it once it is ready
+        self.pendingPath = None
+        self.playWhenLoaded = False
+
+        self.output = None
+        self.buffer = None
+
+        # simpleaudio play object, when QtMultimedia is not available
+        self.playObject = None
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.decoded.connect(self.onDecoded)
+
+    # Decode the file at path in the background (immediately if it is cached)
+    def load(self, path, play=False):
+        self.stop()
+
+        segment = self.audioCache.cached(path)
+        if segment is not None:
+            self.setSegment(segment)
+            if play:
+                self.play()
+            return
+
+        self.segment = None
+        self.pendingPath = path
+        self.playWhenLoaded = play
+        self.executor.submit(self.decode, path)
+
+    # Use an already decoded segment
+    def setSegment(self, segment):
+        self.stop()
+        self.pendingPath = None
+        self.segment = segment
+
+    # Runs on the worker thread
+    def decode(self, path):
+        try:
+            segment = self.audioCache.get(path)
+        except Exception as e:
+            print("Could not decode audio:", path, e)
+            return
+        self.decoded.emit(path, segment)
+
+    def onDecoded(self, path, segment):
+        # Ignore results of loads that were superseded or cancelled
+        if path != self.pendingPath:
+            return
+
+        self.pendingPath = None
+        self.segment = segment
+        if self.playWhenLoaded:
+            self.play()
+
+    def play(self):
+        self.stop()
+        if self.segment is None:
+            # Still decoding: play as soon as it is ready
+            self.playWhenLoaded = self.pendingPath is not None
+            return
+
+        if not HAS_QT_MULTIMEDIA:
+            # play_buffer returns at once, playback continues on the simpleaudio thread until stop()
+            try:
+                self.playObject = simpleaudio.play_buffer(self.segment.raw_data, self.segment.channels,
+                    self.segment.sample_width, self.segment.frame_rate)
+            except ImportError:
+                print("Cannot play audio: install PyQt5 QtMultimedia or simpleaudio")
+            return
+
+        segment = self.segment
+        audioFormat = self.audioFormat(segment)
+        if not QAudioDeviceInfo.defaultOutputDevice().isFormatSupported(audioFormat):
+            # Fall back to 16-bit stereo 44.1 kHz, which every device supports
+            segment = segment.set_frame_rate(44100).set_sample_width(2).set_channels(2)
+            audioFormat = self.audioFormat(segment)
+
+        self.buffer = QBuffer(self)
+        self.buffer.setData(QByteArray(segment.raw_data))
+        self.buffer.open(QIODevice.ReadOnly)
+
+        self.output = QAudioOutput(audioFormat, self)
+        self.output.start(self.buffer)
+
+    def stop(self):
+        self.playWhenLoaded = False
+
+        if self.output is not None:
+            self.output.stop()
+            self.output.deleteLater()
+            self.output = None
+
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer.deleteLater()
+            self.buffer = None
+
+        if self.playObject is not None:
+            self.playObject.stop()
+            self.playObject = None
+
+    def isPlaying(self):
+        if self.playObject is not None:
+            return self.playObject.is_playing()
+        return self.output is not None and self.output.state() == QAudio.ActiveState
+
+    def audioFormat(self, segment):
+        audioFormat = QAudioFormat()
+        audioFormat.setSampleRate(segment.frame_rate)
+        audioFormat.setChannelCount(segment.channels)
+        audioFormat.setSampleSize(segment.sample_width * 8)
+        audioFormat.setCodec('audio/pcm')
+        audioFormat.setByteOrder(QAudioFormat.LittleEndian)
+        audioFormat.setSampleType(QAudioFormat.SignedInt if segment.sample_width > 1 else QAudioFormat.UnSignedInt)
+        return audioFormat
@@ -0,0 +1,88 @@
+import os
+import sys
+import shutil
+import argparse
+import importlib.util
+import time
+import threading
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+from pydub.generators import Sine
+from audioPlayer import AudioPlayer, AudioCache
+
+
+# Interval of the probe timer, in ms
+TICK_MS = 5
+
+
+# Measure how late a periodic QTimer fires while fcnStart plays a clip
+def measureLatency(app, fcnStart, durationMs):
+    lateness = []
+    last = [None]
+
+    def tick():
+        now = time.perf_counter()
+        if last[0] is not None:
+            lateness.append((now - last[0]) * 1000 - TICK_MS)
+        last[0] = now
+
+    timer = QTimer()
+    timer.setInterval(TICK_MS)
+    timer.timeout.connect(tick)
+    timer.start()
+
+    QTimer.singleShot(0, fcnStart)
+    QTimer.singleShot(durationMs, app.quit)
+    app.exec_()
+    timer.stop()
+
+    return np.array(lateness)
+
+
+# pydub.playback plays through simpleaudio, pyaudio or ffplay, in that order
+def hasPlaybackBackend():
+    return any(importlib.util.find_spec(name) is not None for name in ('simpleaudio', 'pyaudio')) or shutil.which('ffplay') is not None
+
+
+def report(name, lateness):
+    print(f"{name:>24}: ticks={len(lateness):5d} p50={np.percentile(lateness, 50):7.2f}ms "
+          f"p99={np.percentile(lateness, 99):7.2f}ms max={lateness.max():8.2f}ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure how long audio playback stalls the Qt event loop.')
+    parser.add_argument('--max-stall', type=float, default=50, help='ms the event loop may stall while AudioPlayer plays')
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    clip = Sine(440).to_audio_segment(duration=2000)
+    durationMs = len(clip) + 500
+
+    player = AudioPlayer(AudioCache())
+    player.setSegment(clip)
+    lateness = measureLatency(app, player.play, durationMs)
+    player.stop()
+    report('AudioPlayer', lateness)
+
+    if hasPlaybackBackend():
+        from pydub import playback
+
+        # The old path, for comparison: playback.play blocks the event loop for the whole clip
+        report('pydub playback.play', measureLatency(app, lambda: playback.play(clip), durationMs))
+
+        # Same clip on a plain thread, to separate GIL contention from blocking
+        report('playback.play in thread', measureLatency(app, lambda: threading.Thread(target=playback.play, args=(clip,), daemon=True).start(), durationMs))
+    else:
+        print('Skipping the pydub playback.play comparison: no simpleaudio, pyaudio or ffplay installed')
+
+    if len(lateness) == 0:
+        print('AudioPlayer: the probe timer never fired')
+        sys.exit(1)
+    if lateness.max() > args.max_stall:
+        print(f'AudioPlayer stalled the event loop for {lateness.max():.2f}ms, more than --max-stall {args.max_stall:.2f}ms')
+        sys.exit(1)
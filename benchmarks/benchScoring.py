@@ -0,0 +1,74 @@
+import os
+import sys
+import timeit
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scoring
+from sketchMask import INK, blankMask, packInk
+
+
+# Canvas sizes to benchmark (width, height)
+SIZES = {
+    'kiosk': (1024, 600),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+}
+
+
+# Random strokes on a blank mask
+def randomStrokes(width, height, count, seed):
+    rng = np.random.default_rng(seed)
+    mask = blankMask(width, height)
+    points = rng.integers(0, [width, height], size=(count, 2, 2)).astype(np.int32)
+    cv2.polylines(mask, list(points), False, INK, 8)
+    return mask
+
+
+# The original calculateScore, on 3-channel frames
+def legacyScore(currentDrawing, childSketch):
+    currentDrawing = currentDrawing.copy()
+    childSketch = childSketch.copy()
+
+    currentDrawing[currentDrawing < 128] = 0
+    currentDrawing[currentDrawing >= 128] = 255
+    childSketch[childSketch < 128] = 0
+    childSketch[childSketch >= 128] = 255
+
+    matches = cv2.bitwise_and(cv2.bitwise_not(currentDrawing), cv2.bitwise_not(childSketch))
+    nonMatches = cv2.bitwise_and(currentDrawing, cv2.bitwise_not(childSketch))
+
+    matchPixels = np.sum(matches[:,:,0] == 255)
+    nonMatchPixels = np.sum(nonMatches[:,:,0] == 255)
+    totalPixels = np.sum(currentDrawing[:,:,0] == 0)
+
+    return scoring.computeScore(matchPixels, nonMatchPixels, totalPixels)
+
+
+def bench(fcn, repeat):
+    return min(timeit.repeat(fcn, number=1, repeat=repeat)) * 1000
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    print(f"{'size':>8} {'legacy ms':>10} {'fused ms':>10} {'packed ms':>10} {'speedup':>8}")
+    for name, (width, height) in SIZES.items():
+        drawing = randomStrokes(width, height, 20, 0)
+        sketch = randomStrokes(width, height, 40, 1)
+        drawing3 = cv2.cvtColor(drawing, cv2.COLOR_GRAY2BGR)
+        sketch3 = cv2.cvtColor(sketch, cv2.COLOR_GRAY2BGR)
+        drawingPacked = packInk(drawing)
+
+        # All kernels must agree before timing them
+        expected = legacyScore(drawing3, sketch3)
+        assert abs(scoring.scoreMasks(drawing, sketch) - expected) < 1e-9
+        assert abs(scoring.scorePacked(drawing, sketch) - expected) < 1e-9
+
+        legacyMs = bench(lambda: legacyScore(drawing3, sketch3), repeat)
+        fusedMs = bench(lambda: scoring.countPixels(drawing, sketch), repeat)
+        packedMs = bench(lambda: scoring.countPackedPixels(drawingPacked, packInk(sketch)), repeat)
+
+        print(f"{name:>8} {legacyMs:10.2f} {fusedMs:10.2f} {packedMs:10.2f} {legacyMs / fusedMs:7.1f}x")
@@ -0,0 +1,213 @@
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+from kioskHarness import KioskHarness, synthStroke, REPO_DIR
+
+
+# Working resolutions for the scoring benchmark (width, height)
+SIZES = {
+    'small': (640, 375),
+    'kiosk': (1024, 600),
+    '1080p': (1920, 1080),
+}
+
+# Moves per frame: a 1 kHz touch controller on a 60 Hz panel
+EVENTS_PER_FRAME = 16
+
+
+# p95 is the 95th percentile of the worst direction: the 5th percentile of a rate
+def summarize(samples, unit, higherIsBetter=False):
+    samples = np.asarray(samples, float)
+    return {
+        'unit': unit,
+        'higherIsBetter': higherIsBetter,
+        'samples': len(samples),
+        'median': float(np.median(samples)),
+        'p95': float(np.percentile(samples, 5 if higherIsBetter else 95)),
+        'best': float(samples.max() if higherIsBetter else samples.min()),
+    }
+
+
+def firstDrawing(harness):
+    catalog = harness.window.catalog
+    category = catalog.categories()[0]
+    level = catalog.levels(category)[0]
+    return category, level, catalog.drawings(category, level)[0]
+
+
+# Moves per second through mouseMoveEvent, with and without the per-frame rasterization
+def benchMouseEvents(harness, repeat, rng):
+    harness.window.workingSize = None
+    harness.openDrawing(*firstDrawing(harness))
+    results = {}
+    for name, flushEvery in [('mouseMove.events', 0), ('mouseMove.eventsWithFlush', EVENTS_PER_FRAME)]:
+        rates = []
+        for _ in range(repeat):
+            stroke = synthStroke(rng, points=500, speed=3.0, rate=1000)
+            start = time.perf_counter()
+            harness.drawStroke(stroke, flushEvery)
+            rates.append(len(stroke) / (time.perf_counter() - start))
+        results[name] = summarize(rates, 'events/s', higherIsBetter=True)
+    return results
+
+
+# calculateScore on a sketch of a few strokes, at every working resolution
+def benchCalculateScore(harness, repeat, rng, sizes):
+    results = {}
+    for name in sizes:
+        harness.window.workingSize = SIZES[name]
+        harness.openDrawing(*firstDrawing(harness))
+        latencies = []
+        for _ in range(repeat):
+            for _ in range(5):
+                harness.drawStroke(synthStroke(rng, points=100), EVENTS_PER_FRAME)
+            start = time.perf_counter()
+            harness.window.calculateScore()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            # The failed attempt restarts the drawing in the background
+            harness.waitIdle()
+        results[f'calculateScore.{name}'] = summarize(latencies, 'ms')
+    harness.window.workingSize = None
+    return results
+
+
+# From the start button to the drawing page:
+# - cold: no template in memory or on disk (decode, binarize, write sidecars)
+# - sidecar: template sidecars on disk only (a restarted kiosk)
+# - warm: template in memory (the prefetched next drawing)
+def benchStartDrawing(harness, repeat):
+    drawing = firstDrawing(harness)
+    results = {}
+    for name in ['cold', 'sidecar', 'warm']:
+        latencies = []
+        for _ in range(repeat):
+            if name == 'cold':
+                harness.clearTemplateCache()
+            elif name == 'sidecar':
+                harness.clearTemplateCache(keepSidecars=True)
+            latencies.append(harness.openDrawing(*drawing) * 1000)
+        results[f'startDrawing.{name}'] = summarize(latencies, 'ms')
+    return results
+
+
+# Populating the selection lists; refreshSelectImages cold reloads the completed drawings from the store
+def benchRefreshSelect(harness, repeat):
+    window = harness.window
+    category, level, _ = firstDrawing(harness)
+    samples = {'refreshSelectCategories': [], 'refreshSelectLevels': [], 'refreshSelectImages.cold': [], 'refreshSelectImages.warm': []}
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        window.refreshSelectCategories()
+        samples['refreshSelectCategories'].append(time.perf_counter() - start)
+
+        # Select without the signal, to time each refresh on its own
+        window.listSelectCategory.blockSignals(True)
+        window.listSelectCategory.setCurrentRow(0)
+        window.listSelectCategory.blockSignals(False)
+        start = time.perf_counter()
+        window.refreshSelectLevels()
+        samples['refreshSelectLevels'].append(time.perf_counter() - start)
+
+        window.listSelectLevel.blockSignals(True)
+        window.listSelectLevel.setCurrentRow(0)
+        window.listSelectLevel.blockSignals(False)
+        window.completion.clear()
+        start = time.perf_counter()
+        window.refreshSelectImages()
+        samples['refreshSelectImages.cold'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        window.refreshSelectImages()
+        samples['refreshSelectImages.warm'].append(time.perf_counter() - start)
+
+    return {name: summarize(np.array(values) * 1000, 'ms') for name, values in samples.items()}
+
+
+def gitCommit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Relative change of every metric present in both runs, positive is worse
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"{'metric':<34} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in sorted(results['results'].items()):
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        if current['higherIsBetter']:
+            change = previous['median'] / current['median'] - 1
+        else:
+            change = current['median'] / previous['median'] - 1
+        flag = ' REGRESSION' if change > tolerance else ''
+        print(f"{name:<34} {previous['median']:12.3f} {current['median']:12.3f} {100 * change:+7.1f}%{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def printResults(results):
+    print(f"{'metric':<34} {'median':>12} {'p95':>12} {'unit':>9}")
+    for name, result in sorted(results.items()):
+        print(f"{name:<34} {result['median']:12.3f} {result['p95']:12.3f} {result['unit']:>9}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless benchmarks of drawing, scoring and page transitions.')
+    parser.add_argument('--categories', type=int, default=10, help='N categories of the generated database')
+    parser.add_argument('--levels', type=int, default=10, help='M levels per category')
+    parser.add_argument('--drawings', type=int, default=20, help='K drawings per level')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--sizes', default=','.join(SIZES), help='working resolutions of the scoring benchmark')
+    parser.add_argument('--ui', help='path of thesisUi.ui (default: next to thesisMain_G9.py)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    harness = KioskHarness(args.categories, args.levels, args.drawings, uiPath=args.ui)
+    try:
+        results = {}
+        results.update(benchMouseEvents(harness, args.repeat, rng))
+        results.update(benchCalculateScore(harness, args.repeat, rng, args.sizes.split(',')))
+        results.update(benchStartDrawing(harness, args.repeat))
+        results.update(benchRefreshSelect(harness, args.repeat))
+    finally:
+        harness.close()
+
+    run = {
+        'meta': {
+            'time': time.time(),
+            'commit': gitCommit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'database': [args.categories, args.levels, args.drawings],
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    printResults(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        if compare(run, baseline, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import cv2
+from PyQt5.QtCore import QEvent, QPointF, Qt
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication, QMessageBox
+from sketchMask import INK, PAPER
+
+
+# Shared setup of the benchmarks and the load generator: a MainWindow on a generated database
+# - everything is created under a temporary root, laid out like the kiosk:
+#   <root>/app/run (working directory, holds thesisUi.ui), <root>/database, <root>/users, <root>/cache
+# - message boxes return at once instead of waiting for a tap
+
+
+# Smooth random stroke in [0, 1] x [0, 1], as a list of (x, y, t) with t in seconds
+# Speed is in screen heights per second; a fast scribble is about 3
+def synthStroke(rng, points=200, speed=1.0, rate=240):
+    position = rng.uniform(0.2, 0.8, 2)
+    angle = rng.uniform(0, 2 * np.pi)
+    stroke = []
+    for i in range(points):
+        angle += rng.normal(0, 0.3)
+        position = np.clip(position + speed / rate * np.array([np.cos(angle), np.sin(angle)]), 0, 1)
+        stroke.append((float(position[0]), float(position[1]), i / rate))
+    return stroke
+
+
+# Random template image: white paper with a few thick black polylines
+def synthTemplate(rng, width=1024, height=600, lines=6):
+    img = np.full((height, width), PAPER, np.uint8)
+    for _ in range(lines):
+        stroke = synthStroke(rng, points=120, speed=1.5, rate=120)
+        points = np.array([(x * (width - 1), y * (height - 1)) for x, y, _ in stroke], np.int32)
+        cv2.polylines(img, [points], False, INK, 12)
+    return img
+
+
+# N categories x M levels x K drawings, named so that the sort order is the creation order
+def generateDatabase(databasePath, categories, levels, drawings, seed=0):
+    rng = np.random.default_rng(seed)
+
+    # A few distinct templates are enough, the files are copies
+    templates = [synthTemplate(rng) for _ in range(min(drawings, 8))]
+    for c in range(categories):
+        for l in range(levels):
+            levelPath = os.path.join(databasePath, f'category{c:03d}', f'level{l:03d}')
+            os.makedirs(levelPath, exist_ok=True)
+            with open(os.path.join(levelPath, 'instructions.txt'), 'w') as f:
+                f.write('Trace the drawing.')
+            for d in range(drawings):
+                cv2.imwrite(os.path.join(levelPath, f'drawing{d:03d}.jpg'), templates[d % len(templates)])
+
+
+class KioskHarness:
+    def __init__(self, categories=3, levels=3, drawings=5, uiPath=None, root=None, seed=0):
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+
+        # Never block on a message box
+        QMessageBox.exec_ = lambda msg: QMessageBox.Yes
+
+        self.ownsRoot = root is None
+        self.root = root or tempfile.mkdtemp(prefix='kioskbench_')
+        self.workDir = os.path.join(self.root, 'app', 'run')
+        os.makedirs(self.workDir, exist_ok=True)
+        shutil.copy(uiPath or os.path.join(REPO_DIR, 'thesisUi.ui'), self.workDir)
+        generateDatabase(os.path.join(self.root, 'database'), categories, levels, drawings, seed)
+
+        # The kiosk uses paths relative to its working directory
+        self.previousDir = os.getcwd()
+        os.chdir(self.workDir)
+
+        import thesisMain_G9
+        self.module = thesisMain_G9
+        self.window = thesisMain_G9.MainWindow()
+        self.window.show()
+
+        # Run the deferred startup (catalog, progress store)
+        self.waitUntil(lambda: hasattr(self.window, 'catalog'))
+
+        # Every attempt fails, so nothing is ever dispensed, even when run on a kiosk
+        self.window.scoreThresh = 101
+        self.window.currentUser = 'BENCH'
+
+    def close(self):
+        self.window.persistence.close()
+        if hasattr(self.window, 'dispenser'):
+            self.window.dispenser.close(timeout=1)
+        self.window.close()
+        os.chdir(self.previousDir)
+        if self.ownsRoot:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def waitUntil(self, condition, timeout=30):
+        deadline = time.perf_counter() + timeout
+        while True:
+            self.app.processEvents()
+            if condition():
+                return
+            if time.perf_counter() > deadline:
+                raise TimeoutError('Condition not met within %s s' % timeout)
+            time.sleep(0.0005)
+
+    def waitIdle(self):
+        self.waitUntil(lambda: not self.window.tasks.isBusy())
+
+    # Select the drawing on the level selection page, as a child would
+    def selectDrawing(self, category, level, image):
+        window = self.window
+        window.refreshSelectCategories()
+        window.listSelectCategory.setCurrentItem(window.listSelectCategory.findItems(category, Qt.MatchExactly)[0])
+        window.listSelectLevel.setCurrentItem(window.listSelectLevel.findItems(level, Qt.MatchExactly)[0])
+        row = window.completion.level(window.currentUser, category, level).row(image)
+        window.listSelectDrawing.setCurrentRow(row)
+        window.selectProceed()
+
+    # Open the drawing page for a drawing, returns the seconds from the tap to the page being shown
+    def openDrawing(self, category, level, image):
+        self.selectDrawing(category, level, image)
+        start = time.perf_counter()
+        self.window.startDrawing()
+        self.waitUntil(lambda: self.window.stackedWidget.currentWidget() is self.window.pgDraw and not self.window.tasks.isBusy())
+        return time.perf_counter() - start
+
+    def mouseEvent(self, eventType, x, y):
+        buttons = Qt.NoButton if eventType == QEvent.MouseButtonRelease else Qt.LeftButton
+        button = Qt.NoButton if eventType == QEvent.MouseMove else Qt.LeftButton
+        return QMouseEvent(eventType, QPointF(x, y), button, buttons, Qt.NoModifier)
+
+    # Send a normalized stroke through the patched handlers of the drawingArea
+    # flushEvery > 0 rasterizes every flushEvery moves, like the frame timer would
+    def drawStroke(self, stroke, flushEvery=0):
+        area = self.window.drawingArea
+        width, height = area.width() - 1, area.height() - 1
+        points = [(x * width, y * height) for x, y, _ in stroke]
+
+        QApplication.sendEvent(area, self.mouseEvent(QEvent.MouseButtonPress, *points[0]))
+        for i, (x, y) in enumerate(points[1:]):
+            QApplication.sendEvent(area, self.mouseEvent(QEvent.MouseMove, x, y))
+            if flushEvery and (i + 1) % flushEvery == 0:
+                self.window.flushStroke()
+        QApplication.sendEvent(area, self.mouseEvent(QEvent.MouseButtonRelease, *points[-1]))
+
+    # Drop the in-memory and on-disk template caches
+    def clearTemplateCache(self, keepSidecars=False):
+        cache = self.window.templateCache
+        with cache.lock:
+            cache.entries.clear()
+            if not keepSidecars:
+                shutil.rmtree(cache.cacheDir, ignore_errors=True)
+                os.makedirs(cache.cacheDir, exist_ok=True)
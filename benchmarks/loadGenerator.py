@@ -0,0 +1,263 @@
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import numpy as np
+
+from kioskHarness import KioskHarness, synthStroke
+from PyQt5.QtCore import QEvent, QEventLoop, QTimer, Qt
+from PyQt5.QtWidgets import QApplication
+from strokeLog import StrokeLog, TOOL_PENCIL, TOOL_ERASER
+
+
+# Replays touch traces into the drawingArea at 1x - 50x real time and measures how the drawing path keeps up
+# - a trace is a list of strokes, each a list of (x, y, t): x and y in [0, 1], t in seconds from the start of the trace
+# - traces come from a JSON file, from the stroke logs of a progress.db, or are synthesized (fast scribbles)
+# - events are sent from a 1 ms timer at their scheduled time; a move that is more than --max-lag late and
+#   already superseded by a newer move is dropped, as a touch driver coalesces moves under backlog
+# - frame times are the intervals between paints of the drawingArea while a stroke is drawn
+
+
+# Pause between the strokes of a synthesized trace, in seconds
+STROKE_GAP = 0.3
+
+
+def synthTrace(rng, strokes, speed=3.0, rate=240):
+    trace = []
+    start = 0.0
+    for _ in range(strokes):
+        stroke = [(x, y, start + t) for x, y, t in synthStroke(rng, points=rate, speed=speed, rate=rate)]
+        trace.append(stroke)
+        start = stroke[-1][2] + STROKE_GAP
+    return trace
+
+
+def traceFromStrokeLog(log):
+    counts = np.frombuffer(log.pointCounts, np.uint32)
+    ends = np.cumsum(counts)
+    times = np.frombuffer(log.times, np.uint32) / 1000
+    trace = []
+    for (tool, points), start, end in zip(log.strokes(), ends - counts, ends):
+        if tool not in (TOOL_PENCIL, TOOL_ERASER) or len(points) < 2:
+            continue
+        trace.append([(x / log.width, y / log.height, t) for (x, y), t in zip(points.tolist(), times[start:end].tolist())])
+    return trace
+
+
+# Recorded attempts of all users, newest first
+def tracesFromDatabase(path, limit):
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        rows = connection.execute('SELECT strokes FROM attempts WHERE strokes IS NOT NULL ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+    finally:
+        connection.close()
+    traces = [traceFromStrokeLog(StrokeLog.decode(strokes)) for strokes, in rows]
+    return [trace for trace in traces if trace]
+
+
+# (time, event type, x, y) in drawingArea pixels, sorted by time
+def schedule(trace, width, height, speed):
+    events = []
+    for stroke in trace:
+        for i, (x, y, t) in enumerate(stroke):
+            if i == 0:
+                eventType = QEvent.MouseButtonPress
+            elif i == len(stroke) - 1:
+                eventType = QEvent.MouseButtonRelease
+            else:
+                eventType = QEvent.MouseMove
+            events.append((t / speed, eventType, x * (width - 1), y * (height - 1)))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+class Replay:
+    def __init__(self, harness, maxLag):
+        self.harness = harness
+        self.window = harness.window
+        self.maxLag = maxLag
+
+        # Counters of the current run, reset by run()
+        self.reset([])
+
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(1)
+        self.timer.timeout.connect(self.tick)
+        self.loop = QEventLoop()
+
+    def reset(self, events):
+        self.events = events
+        self.next = 0
+        self.sentMoves = 0
+        self.droppedMoves = 0
+        self.handledMoves = 0
+        self.lags = []
+        self.paintTimes = []
+
+    def countedMove(self, event):
+        self.handledMoves += 1
+        self.originalMove(event)
+
+    def timedPaint(self, event):
+        if self.window.isDrawing:
+            self.paintTimes.append(time.perf_counter())
+        elif self.paintTimes and self.paintTimes[-1] is not None:
+            # Do not count the pause between two strokes as a frame
+            self.paintTimes.append(None)
+        self.originalPaint(event)
+
+    def run(self, events):
+        self.reset(events)
+
+        # Count the moves that reach the patched handler, and time the paints, during this run only
+        area = self.window.drawingArea
+        self.originalMove = area.mouseMoveEvent
+        self.originalPaint = area.paintEvent
+        area.mouseMoveEvent = self.countedMove
+        area.paintEvent = self.timedPaint
+        try:
+            self.start = time.perf_counter()
+            self.timer.start()
+            self.loop.exec_()
+
+            # Let the last frame paint
+            self.harness.waitUntil(lambda: True)
+        finally:
+            self.timer.stop()
+            area.mouseMoveEvent = self.originalMove
+            area.paintEvent = self.originalPaint
+
+        return self.metrics(time.perf_counter() - self.start)
+
+    def tick(self):
+        now = time.perf_counter() - self.start
+        area = self.window.drawingArea
+
+        while self.next < len(self.events) and self.events[self.next][0] <= now:
+            scheduled, eventType, x, y = self.events[self.next]
+            self.next += 1
+            lag = now - scheduled
+
+            if eventType == QEvent.MouseMove:
+                superseded = self.next < len(self.events) and self.events[self.next][1] == QEvent.MouseMove and self.events[self.next][0] <= now
+                if superseded and lag > self.maxLag:
+                    self.droppedMoves += 1
+                    continue
+                self.sentMoves += 1
+
+            self.lags.append(lag)
+            QApplication.sendEvent(area, self.harness.mouseEvent(eventType, x, y))
+
+            # Sending may have taken a while (a release flushes the stroke)
+            now = time.perf_counter() - self.start
+
+        if self.next >= len(self.events):
+            self.loop.quit()
+
+    def metrics(self, elapsed):
+        # Frame intervals within strokes
+        intervals = []
+        for previous, current in zip(self.paintTimes, self.paintTimes[1:]):
+            if previous is not None and current is not None:
+                intervals.append(current - previous)
+        intervals = np.array(intervals) * 1000
+        frameMs = self.window.frameTimer.interval()
+
+        moves = self.sentMoves + self.droppedMoves
+        return {
+            'events': len(self.events),
+            'elapsed': elapsed,
+            'moves': moves,
+            'droppedRate': self.droppedMoves / moves if moves else 0.0,
+            'unhandledMoves': self.sentMoves - self.handledMoves,
+            'lagP50': float(np.percentile(self.lags, 50)) * 1000 if self.lags else 0.0,
+            'lagP99': float(np.percentile(self.lags, 99)) * 1000 if self.lags else 0.0,
+            'frames': len(intervals),
+            'frameMean': float(intervals.mean()) if len(intervals) else 0.0,
+            'frameJitter': float(intervals.std()) if len(intervals) else 0.0,
+            'frameP99': float(np.percentile(intervals, 99)) if len(intervals) else 0.0,
+            'jankyFrames': int((intervals > 1.5 * frameMs).sum()),
+        }
+
+
+# Sum the counts, weight the rates and means by moves or frames, and keep the worst p99 of all traces
+def combine(results):
+    total = {}
+    for key in ['events', 'elapsed', 'moves', 'unhandledMoves', 'frames', 'jankyFrames']:
+        total[key] = sum(r[key] for r in results)
+    moves = max(total['moves'], 1)
+    frames = max(total['frames'], 1)
+    total['droppedRate'] = sum(r['droppedRate'] * r['moves'] for r in results) / moves
+    total['lagP50'] = float(np.median([r['lagP50'] for r in results]))
+    total['lagP99'] = max(r['lagP99'] for r in results)
+    total['frameMean'] = sum(r['frameMean'] * r['frames'] for r in results) / frames
+    total['frameJitter'] = sum(r['frameJitter'] * r['frames'] for r in results) / frames
+    total['frameP99'] = max(r['frameP99'] for r in results)
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay touch traces into the drawing page at accelerated speed.')
+    parser.add_argument('--speeds', default='1,5,10,25,50', help='replay speeds, multiples of real time')
+    parser.add_argument('--trace', help='JSON file with a list of traces')
+    parser.add_argument('--db', help='progress.db to replay the recorded attempts from')
+    parser.add_argument('--limit', type=int, default=20, help='number of recorded attempts to replay')
+    parser.add_argument('--synth', type=int, default=5, help='number of synthesized traces, without --trace or --db')
+    parser.add_argument('--strokes', type=int, default=10, help='strokes per synthesized trace')
+    parser.add_argument('--save-trace', help='write the replayed traces to this JSON file')
+    parser.add_argument('--max-lag', type=float, default=1000 / 60, help='ms a move may be late before it is coalesced')
+    parser.add_argument('--working-size', help='working resolution WxH (default: the drawingArea size)')
+    parser.add_argument('--ui', help='path of thesisUi.ui (default: next to thesisMain_G9.py)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    if args.trace:
+        with open(args.trace) as f:
+            traces = json.load(f)
+    elif args.db:
+        traces = tracesFromDatabase(args.db, args.limit)
+    else:
+        rng = np.random.default_rng(0)
+        traces = [synthTrace(rng, args.strokes) for _ in range(args.synth)]
+
+    if not traces:
+        print('No traces to replay')
+        sys.exit(1)
+
+    if args.save_trace:
+        with open(args.save_trace, 'w') as f:
+            json.dump(traces, f)
+
+    harness = KioskHarness(1, 1, 1, uiPath=args.ui)
+    if args.working_size:
+        harness.window.workingSize = tuple(int(v) for v in args.working_size.lower().split('x'))
+    catalog = harness.window.catalog
+    category = catalog.categories()[0]
+    level = catalog.levels(category)[0]
+    drawing = (category, level, catalog.drawings(category, level)[0])
+
+    results = {}
+    try:
+        harness.openDrawing(*drawing)
+        replay = Replay(harness, args.max_lag / 1000)
+        area = harness.window.drawingArea
+        for speed in [float(s) for s in args.speeds.split(',')]:
+            perTrace = []
+            for trace in traces:
+                # Start every trace on a blank sketch
+                harness.openDrawing(*drawing)
+                perTrace.append(replay.run(schedule(trace, area.width(), area.height(), speed)))
+            results[f'{speed:g}x'] = combine(perTrace)
+    finally:
+        harness.close()
+
+    print(f"{'speed':>6} {'events':>8} {'dropped':>8} {'lag p50':>8} {'lag p99':>8} {'frame ms':>9} {'jitter':>7} {'p99':>7} {'janky':>6}")
+    for speed, r in results.items():
+        print(f"{speed:>6} {r['events']:8d} {100 * r['droppedRate']:7.2f}% {r['lagP50']:8.2f} {r['lagP99']:8.2f} "
+              f"{r['frameMean']:9.2f} {r['frameJitter']:7.2f} {r['frameP99']:7.2f} {r['jankyFrames']:6d}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'time': time.time(), 'traces': len(traces), 'maxLag': args.max_lag, 'results': results}, f, indent=2)
@@ -0,0 +1,61 @@
+import numpy as np
+from PyQt5.QtGui import QImage
+from sketchMask import INK
+
+
+# Colour of the child's strokes on the canvas (RGB)
+SKETCH_COLOR = (0, 0, 255)
+
+
+# Keeps a persistent RGB canvas and recomposes only the regions that changed
+class CanvasCompositor:
+    def __init__(self, width, height, grayValue=0, strokeWidth=8):
+        self.width = width
+        self.height = height
+
+        # Gray value used for the template lines
+        self.grayValue = grayValue
+
+        # Thickness of the cv2.line strokes, used to pad the dirty rectangles
+        self.strokeWidth = strokeWidth
+
+        # Persistent RGB canvas buffer
+        self.rgb = np.full((height, width, 3), 255, np.uint8)
+
+        # QImage view of the canvas buffer (no copy, self.rgb must stay alive)
+        self.qImage = QImage(self.rgb.data, width, height, width * 3, QImage.Format_RGB888)
+
+    # Clear the canvas in place, keeping the buffer and its QImage view
+    def reset(self):
+        self.rgb.fill(255)
+
+    # Bounding box (x0, y0, x1, y1) of a polyline stroke, clipped to the canvas
+    def pointsRect(self, points):
+        pad = self.strokeWidth // 2 + 1
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        x0 = max(min(xs) - pad, 0)
+        y0 = max(min(ys) - pad, 0)
+        x1 = min(max(xs) + pad + 1, self.width)
+        y1 = min(max(ys) + pad + 1, self.height)
+
+        if x0 >= x1 or y0 >= y1:
+            return None
+
+        return (x0, y0, x1, y1)
+
+    # Recompose the canvas inside rect from the template and the child sketch
+    def composeRegion(self, currentDrawing, childSketch, rect):
+        x0, y0, x1, y1 = rect
+        region = self.rgb[y0:y1, x0:x1]
+
+        # Template mask into the RGB canvas, template lines in the gray value
+        template = currentDrawing[y0:y1, x0:x1]
+        region[...] = template[:, :, None]
+        region[template == INK] = self.grayValue
+
+        # Paint the child sketch on top
+        region[childSketch[y0:y1, x0:x1] == INK] = SKETCH_COLOR
+
+    def composeAll(self, currentDrawing, childSketch):
+        self.composeRegion(currentDrawing, childSketch, (0, 0, self.width, self.height))
@@ -0,0 +1,9 @@
+from PyQt5 import uic
+
+# Precompile thesisUi.ui into thesisUi_ui.py, so the kiosk does not parse the XML at startup
+# Run again after changing thesisUi.ui (the kiosk ignores a thesisUi_ui.py older than thesisUi.ui)
+# The compiled module imports the Qt resources from resources.py, like the running application
+if __name__ == '__main__':
+    with open('thesisUi_ui.py', 'w') as f:
+        uic.compileUi('thesisUi.ui', f, resource_suffix='')
+    print('Wrote thesisUi_ui.py')
@@ -0,0 +1,65 @@
+# Completion state of the drawings of one level for one user
+# Drawings are rows of a bitset, so marking and "level complete" are constant time
+class LevelCompletion:
+    def __init__(self, drawings, completed):
+        self.drawings = list(drawings)
+        self.rows = {drawing: row for row, drawing in enumerate(self.drawings)}
+        self.bits = 0
+        self.count = 0
+
+        for drawing in completed:
+            self.markCompleted(drawing)
+
+    # Returns True if the drawing was not completed before
+    def markCompleted(self, drawing):
+        row = self.rows.get(drawing)
+        if row is None:
+            return False
+
+        bit = 1 << row
+        if self.bits & bit:
+            return False
+
+        self.bits |= bit
+        self.count += 1
+        return True
+
+    def isCompleted(self, drawing):
+        row = self.rows.get(drawing)
+        return row is not None and bool(self.bits & (1 << row))
+
+    def isLevelComplete(self):
+        return self.count == len(self.drawings)
+
+    # Row of the drawing in the level, -1 if it is not in it
+    def row(self, drawing):
+        return self.rows.get(drawing, -1)
+
+    # The drawing after this one in the level, None if it is the last
+    def nextDrawing(self, drawing):
+        row = self.row(drawing) + 1
+        if row == 0 or row >= len(self.drawings):
+            return None
+        return self.drawings[row]
+
+
+# LevelCompletion of every (user, category, level) seen so far, seeded from the progress store
+# Seeding reads the store as committed; flush the queued writes before clear() to keep them visible
+class CompletionTracker:
+    def __init__(self, catalog, progressStore):
+        self.catalog = catalog
+        self.progressStore = progressStore
+        self.levels = {}
+
+    def level(self, user, category, level):
+        key = (user, category, level)
+        levelCompletion = self.levels.get(key)
+        if levelCompletion is None:
+            levelCompletion = LevelCompletion(self.catalog.drawings(category, level), self.progressStore.completedSet(user, category, level))
+            self.levels[key] = levelCompletion
+
+        return levelCompletion
+
+    # Forget everything, e.g. after drawings were added or deleted
+    def clear(self):
+        self.levels = {}
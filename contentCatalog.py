@@ -0,0 +1,182 @@
+import os
+import json
+
+
+# Version of the index file layout
+INDEX_VERSION = 1
+
+
+# In-memory index of the drawing database: category -> level -> drawings
+# - built once and persisted to a single index file
+# - on load, only directories whose mtime changed are scanned again
+# - the admin actions update it incrementally through the rescan/set methods
+class ContentCatalog:
+    def __init__(self, databasePath, indexPath):
+        self.databasePath = databasePath
+        self.indexPath = indexPath
+        self.index = {'version': INDEX_VERSION, 'mtime': None, 'categories': {}}
+
+        self.load()
+        if self.validate():
+            self.save()
+
+    # ============ Queries ============
+    def categories(self):
+        return sorted(self.index['categories'])
+
+    def levels(self, category):
+        levels = self.index['categories'].get(category, {}).get('levels', {})
+        return sorted(levels)
+
+    def level(self, category, level):
+        return self.index['categories'].get(category, {}).get('levels', {}).get(level)
+
+    def drawings(self, category, level):
+        levelEntry = self.level(category, level)
+        if levelEntry is None:
+            return []
+        return sorted(levelEntry['drawings'])
+
+    def drawing(self, category, level, drawing):
+        levelEntry = self.level(category, level)
+        if levelEntry is None:
+            return None
+        return levelEntry['drawings'].get(drawing)
+
+    def instructions(self, category, level):
+        levelEntry = self.level(category, level)
+        if levelEntry is None:
+            return ''
+        return levelEntry['instructions']
+
+    # ============ Updates ============
+    def rescanRoot(self):
+        self.scanRoot()
+        self.save()
+
+    def rescanCategory(self, category):
+        self.scanRoot(rescan=False)
+        if category in self.index['categories']:
+            self.scanCategory(category)
+        self.save()
+
+    def rescanLevel(self, category, level):
+        self.scanRoot(rescan=False)
+        if category in self.index['categories']:
+            self.scanCategory(category, rescan=False)
+            if level in self.index['categories'][category]['levels']:
+                self.scanLevel(category, level)
+        self.save()
+
+    def setInstructions(self, category, level, instructions):
+        levelEntry = self.level(category, level)
+        if levelEntry is not None:
+            levelEntry['instructions'] = instructions
+            self.save()
+
+    # ============ Scanning ============
+    def mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def subdirectories(self, path):
+        return [entry.name for entry in os.scandir(path) if entry.is_dir()]
+
+    # Check every directory mtime against the index, scan what changed
+    # Returns True if the index was modified
+    def validate(self):
+        changed = self.scanRoot(rescan=False)
+        for category in list(self.index['categories']):
+            changed = self.scanCategory(category, rescan=False) or changed
+            for level in list(self.index['categories'][category]['levels']):
+                changed = self.scanLevel(category, level, rescan=False) or changed
+        return changed
+
+    def scanRoot(self, rescan=True):
+        mtime = self.mtime(self.databasePath)
+        if not rescan and mtime == self.index['mtime']:
+            return False
+
+        categories = self.index['categories']
+        names = set(self.subdirectories(self.databasePath))
+        for category in list(categories):
+            if category not in names:
+                del categories[category]
+        for category in names:
+            if category not in categories:
+                categories[category] = {'mtime': None, 'levels': {}}
+                self.scanCategory(category)
+
+        self.index['mtime'] = mtime
+        return True
+
+    def scanCategory(self, category, rescan=True):
+        categoryEntry = self.index['categories'][category]
+        categoryPath = os.path.join(self.databasePath, category)
+        mtime = self.mtime(categoryPath)
+        if not rescan and mtime == categoryEntry['mtime']:
+            return False
+
+        levels = categoryEntry['levels']
+        names = set(self.subdirectories(categoryPath))
+        for level in list(levels):
+            if level not in names:
+                del levels[level]
+        for level in names:
+            if level not in levels:
+                levels[level] = {'mtime': None, 'instructions': '', 'drawings': {}}
+                self.scanLevel(category, level)
+
+        categoryEntry['mtime'] = mtime
+        return True
+
+    def scanLevel(self, category, level, rescan=True):
+        levelEntry = self.index['categories'][category]['levels'][level]
+        levelPath = os.path.join(self.databasePath, category, level)
+        mtime = self.mtime(levelPath)
+        if not rescan and mtime == levelEntry['mtime']:
+            return False
+
+        files = set(os.listdir(levelPath))
+
+        drawings = {}
+        for f in files:
+            if not f.endswith('.jpg'):
+                continue
+            name = f[0:-4]
+            drawings[name] = {
+                'mtime': self.mtime(os.path.join(levelPath, f)),
+                'audio': name + '.mp3' in files,
+                'wav': name + '.wav' in files,
+            }
+        levelEntry['drawings'] = drawings
+
+        instructions = ''
+        if 'instructions.txt' in files:
+            with open(os.path.join(levelPath, 'instructions.txt'), 'r') as f:
+                instructions = f.read()
+        levelEntry['instructions'] = instructions
+
+        levelEntry['mtime'] = mtime
+        return True
+
+    # ============ Index file ============
+    def load(self):
+        try:
+            with open(self.indexPath, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if index.get('version') == INDEX_VERSION:
+            self.index = index
+
+    def save(self):
+        # Write to a temporary file first so a crash never leaves a partial index
+        os.makedirs(os.path.dirname(self.indexPath) or '.', exist_ok=True)
+        tmpPath = self.indexPath + '.tmp'
+        with open(tmpPath, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmpPath, self.indexPath)
@@ -0,0 +1,175 @@
+import os
+import time
+import queue
+import threading
+from lazyImport import lazyImport
+from instrumentation import timed
+
+# Imported on first use, by the driver thread
+serial = lazyImport('serial')
+
+
+# Replies of the microcontroller to a command
+ACK = b'ACK'
+NAK = b'NAK'
+
+
+# Drives the prize dispenser from its own thread
+# - commands are queued, so a slow or missing dispenser never blocks the GUI
+# - the port is opened by the worker and reopened after errors
+# - each command waits for an ACK/NAK line; NAK is retried, silence is not
+#   (firmware that never acknowledges would otherwise dispense twice)
+class DispenserDriver:
+    def __init__(self, port, baudrate=9600, timeout=2.0, retries=3, reconnectDelay=2.0, bootDelay=2.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.retries = retries
+        self.reconnectDelay = reconnectDelay
+
+        # Opening the port resets an Arduino, wait for it to boot
+        self.bootDelay = bootDelay
+
+        self.serial = None
+        self.queue = queue.Queue()
+
+        # Result of the last command: 'ack', 'nak', 'noreply' or 'failed'
+        self.lastResult = None
+
+        self.worker = threading.Thread(target=self.run, name='DispenserDriver', daemon=True)
+        self.worker.start()
+
+    def isConnected(self):
+        return self.serial is not None
+
+    def dispense(self):
+        self.send(b'dispense')
+
+    def send(self, command):
+        self.queue.put(command)
+
+    # Stop the worker after the queued commands are sent
+    def close(self, timeout=None):
+        self.queue.put(None)
+        self.worker.join(timeout)
+
+    def run(self):
+        # Connect early, so the Arduino has booted by the time a prize is won
+        self.connect()
+
+        while True:
+            command = self.queue.get()
+            if command is None:
+                break
+            self.lastResult = self.execute(command)
+            print("Dispenser:", command.decode(), self.lastResult)
+
+        self.disconnect()
+
+    def execute(self, command):
+        for attempt in range(self.retries):
+            if not self.connect():
+                time.sleep(self.reconnectDelay)
+                continue
+
+            try:
+                with timed('serialWrite'):
+                    self.serial.write(command + b'\n')
+                    self.serial.flush()
+                with timed('serialReply'):
+                    reply = self.readReply()
+            except (serial.SerialException, OSError) as e:
+                print("Dispenser error:", e)
+                self.disconnect()
+                continue
+
+            if reply == ACK:
+                return 'ack'
+            if reply is None:
+                return 'noreply'
+            # NAK: the command was refused, try again
+
+        return 'nak' if self.serial is not None else 'failed'
+
+    # Read lines until ACK or NAK, ignoring anything else the firmware prints
+    def readReply(self):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            line = self.serial.readline().strip()
+            if line in (ACK, NAK):
+                return line
+        return None
+
+    def connect(self):
+        if self.serial is not None:
+            return True
+
+        try:
+            self.serial = serial.Serial(self.port, self.baudrate, timeout=self.timeout, write_timeout=self.timeout)
+        except (serial.SerialException, OSError) as e:
+            print("Dispenser not available:", e)
+            self.serial = None
+            return False
+
+        time.sleep(self.bootDelay)
+        self.serial.reset_input_buffer()
+        return True
+
+    def disconnect(self):
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except (serial.SerialException, OSError):
+                pass
+            self.serial = None
+
+
+# Fake dispenser on a pseudo-terminal, for development and tests without the Arduino
+# Pass fake.port to DispenserDriver; every received line is answered with reply
+class FakeDispenser:
+    def __init__(self, reply=ACK, delay=0.0):
+        import pty
+        import tty
+
+        self.reply = reply
+        self.delay = delay
+        self.received = []
+
+        self.master, self.slave = pty.openpty()
+        # Raw mode, so our replies are not echoed back to us
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='FakeDispenser', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        buffer = b''
+        while self.running:
+            try:
+                data = os.read(self.master, 1024)
+            except OSError:
+                break
+            buffer += data
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                self.received.append(line.strip())
+                time.sleep(self.delay)
+                if self.reply is not None:
+                    os.write(self.master, self.reply + b'\n')
+
+    def close(self):
+        self.running = False
+        os.close(self.slave)
+        os.close(self.master)
+
+
+if __name__ == '__main__':
+    # Smoke run of the driver against the fake device
+    fake = FakeDispenser()
+    driver = DispenserDriver(fake.port, bootDelay=0)
+    driver.dispense()
+    driver.close()
+    print("Fake dispenser received:", fake.received, "result:", driver.lastResult)
+    fake.close()
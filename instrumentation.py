@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+import functools
+from logging.handlers import RotatingFileHandler
+
+
+# Off with INSTRUMENTATION=0 in the environment
+ENABLED = os.environ.get('INSTRUMENTATION', '1') != '0'
+
+# HDR-style buckets over microseconds: exact below SUB_BUCKETS, then every power of two
+# is split in SUB_BUCKETS / 2 linear buckets (about 6% wide, so percentiles are within 3%)
+SUB_BUCKETS = 32
+HALF_BUCKETS = SUB_BUCKETS // 2
+SUB_BITS = SUB_BUCKETS.bit_length() - 1
+
+# Largest recorded value, longer calls are counted in the last bucket (about 71 minutes)
+MAX_MICROSECONDS = 2 ** 32 - 1
+
+
+def bucketIndex(micros):
+    if micros < SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - SUB_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + (micros >> shift) - HALF_BUCKETS
+
+
+# Middle of the range of values counted in the bucket, in microseconds
+def bucketValue(index):
+    if index < SUB_BUCKETS:
+        return index
+    shift = (index - SUB_BUCKETS) // HALF_BUCKETS + 1
+    mantissa = (index - SUB_BUCKETS) % HALF_BUCKETS + HALF_BUCKETS
+    return ((mantissa << shift) + ((mantissa + 1) << shift) - 1) / 2
+
+
+BUCKET_COUNT = bucketIndex(MAX_MICROSECONDS) + 1
+
+
+# Fixed-size latency histogram, recording is O(1) and never allocates
+class LatencyHistogram:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * BUCKET_COUNT
+            self.count = 0
+            self.totalSeconds = 0.0
+            self.maxSeconds = 0.0
+
+    def record(self, seconds):
+        micros = min(max(int(seconds * 1e6), 0), MAX_MICROSECONDS)
+        index = bucketIndex(micros)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.totalSeconds += seconds
+            if seconds > self.maxSeconds:
+                self.maxSeconds = seconds
+
+    # Latency (seconds) below which p percent of the calls completed
+    def percentile(self, p):
+        with self.lock:
+            if self.count == 0:
+                return 0.0
+            target = max(int(self.count * p / 100 + 0.5), 1)
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target:
+                    return min(bucketValue(index) / 1e6, self.maxSeconds)
+        return self.maxSeconds
+
+    def summary(self):
+        return {
+            'name': self.name,
+            'count': self.count,
+            'mean': self.totalSeconds / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.maxSeconds,
+        }
+
+    # Non-empty buckets only, {index: count}, so histograms of many kiosks can be merged
+    def buckets(self):
+        with self.lock:
+            return {index: count for index, count in enumerate(self.counts) if count}
+
+
+histograms = {}
+histogramsLock = threading.Lock()
+
+
+def histogram(name):
+    hist = histograms.get(name)
+    if hist is None:
+        with histogramsLock:
+            hist = histograms.setdefault(name, LatencyHistogram(name))
+    return hist
+
+
+def record(name, seconds):
+    if ENABLED:
+        histogram(name).record(seconds)
+
+
+# Time a block (with timed('name'): ...) or every call of a function (@timed('name'))
+class timed:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+    def __call__(self, fn):
+        name = self.name
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+
+        return wrapper
+
+
+def summaries():
+    return [histograms[name].summary() for name in sorted(histograms)]
+
+
+# Human readable table of the percentiles, in milliseconds
+def report():
+    lines = [f"{'':<20} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"]
+    for s in summaries():
+        lines.append(f"{s['name']:<20} {s['count']:>7} {1000 * s['p50']:>8.2f} {1000 * s['p95']:>8.2f} "
+                     f"{1000 * s['p99']:>8.2f} {1000 * s['max']:>8.2f}")
+    return '\n'.join(lines)
+
+
+# Latency log with one JSON line per dump, rotated by size
+dumpLogger = None
+startedAt = time.time()
+
+
+def dump(path, maxBytes=1024 * 1024, backupCount=5):
+    global dumpLogger
+    if dumpLogger is None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=maxBytes, backupCount=backupCount)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        dumpLogger = logging.getLogger('instrumentation')
+        dumpLogger.propagate = False
+        dumpLogger.setLevel(logging.INFO)
+        dumpLogger.addHandler(handler)
+
+    # Counts are cumulative since startedAt; the difference of two dumps gives an interval histogram
+    line = {
+        'host': socket.gethostname(),
+        'startedAt': startedAt,
+        'time': time.time(),
+        'subBuckets': SUB_BUCKETS,
+        'histograms': {s['name']: dict(s, buckets=histograms[s['name']].buckets()) for s in summaries()},
+    }
+    dumpLogger.info(json.dumps(line))
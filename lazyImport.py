@@ -0,0 +1,44 @@
+import time
+import importlib
+import threading
+
+
+# Module proxy importing the real module on first attribute access
+# - keeps heavy imports (cv2, pydub, serial) off the startup path of the kiosk
+# - the import cost is paid once, by the first caller, and recorded in loadSeconds
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+        self.loadSeconds = None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    self.loadSeconds = time.perf_counter() - start
+                    self._module = module
+        return self._module
+
+    def isLoaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+# All lazy modules by name, shared so every importer triggers (and times) a single import
+LAZY_MODULES = {}
+
+
+def lazyImport(name):
+    if name not in LAZY_MODULES:
+        LAZY_MODULES[name] = LazyModule(name)
+    return LAZY_MODULES[name]
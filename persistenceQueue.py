@@ -0,0 +1,86 @@
+import time
+import queue
+import threading
+
+
+# Write-behind queue for the progress store
+# Writes are queued from the GUI thread and committed by a worker thread in batches,
+# one transaction per batch, after at most flushInterval seconds or on flush()
+class PersistenceQueue:
+    def __init__(self, progressStore, flushInterval=1.0):
+        self.progressStore = progressStore
+        self.flushInterval = flushInterval
+
+        self.queue = queue.Queue()
+        self.flushRequested = threading.Event()
+        self.closed = False
+
+        self.worker = threading.Thread(target=self.run, name='PersistenceQueue', daemon=True)
+        self.worker.start()
+
+    # Queue a write: fcn(*args) runs on the worker thread inside a store transaction
+    def submit(self, fcn, *args):
+        if self.closed:
+            raise RuntimeError("PersistenceQueue is closed")
+        self.queue.put((fcn, args))
+
+    def recordScore(self, user, category, level, image, score, passed, strokes=None):
+        self.submit(self.progressStore.insertScore, user, category, level, image, score, passed, time.time(), strokes)
+
+    def hasPending(self):
+        return self.queue.unfinished_tasks > 0
+
+    # Block until everything queued so far is committed
+    def flush(self):
+        self.flushRequested.set()
+        self.queue.join()
+
+    # Commit everything, checkpoint the database to disk and stop the worker
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self.queue.put(None)
+        self.worker.join()
+        self.progressStore.checkpoint()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+
+            batch = [item]
+
+            # Gather more writes until the flush interval ends or a flush is requested
+            deadline = time.monotonic() + self.flushInterval
+            while not self.flushRequested.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.flushRequested.wait(min(remaining, 0.05))
+            self.flushRequested.clear()
+
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Put the stop marker back after this batch
+                    self.queue.task_done()
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+
+            try:
+                with self.progressStore.transaction():
+                    for fcn, args in batch:
+                        fcn(*args)
+            except Exception as e:
+                print("Could not save progress:", e)
+
+            for _ in batch:
+                self.queue.task_done()
@@ -0,0 +1,151 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    category TEXT NOT NULL,
+    level TEXT NOT NULL,
+    image TEXT NOT NULL,
+    score REAL NOT NULL,
+    passed INTEGER NOT NULL,
+    createdAt REAL NOT NULL,
+    strokes BLOB
+);
+CREATE INDEX IF NOT EXISTS attemptsByDrawing ON attempts (user, category, level, image);
+
+CREATE TABLE IF NOT EXISTS completions (
+    user TEXT NOT NULL,
+    category TEXT NOT NULL,
+    level TEXT NOT NULL,
+    image TEXT NOT NULL,
+    bestScore REAL NOT NULL,
+    completedAt REAL NOT NULL,
+    PRIMARY KEY (user, category, level, image)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# Progress of every user in one SQLite database (WAL mode)
+# - attempts: score history, one row per scored attempt
+# - completions: best score of each drawing a user has passed
+class ProgressStore:
+    def __init__(self, dbPath):
+        self.dbPath = dbPath
+        os.makedirs(os.path.dirname(dbPath) or '.', exist_ok=True)
+
+        # The connection is shared between threads, the lock serializes its use
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(dbPath, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+            # Databases created before stroke logs were stored
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(attempts)')]
+            if 'strokes' not in columns:
+                self.connection.execute('ALTER TABLE attempts ADD COLUMN strokes BLOB')
+
+    # Hold the lock and run the insert* methods inside one transaction
+    @contextmanager
+    def transaction(self):
+        with self.lock, self.connection:
+            yield
+
+    # strokes: the encoded StrokeLog of the attempt, or None
+    def recordScore(self, user, category, level, image, score, passed, createdAt=None, strokes=None):
+        if createdAt is None:
+            createdAt = time.time()
+
+        with self.transaction():
+            self.insertScore(user, category, level, image, score, passed, createdAt, strokes)
+
+    # Must be called inside transaction()
+    def insertScore(self, user, category, level, image, score, passed, createdAt, strokes=None):
+        self.connection.execute(
+            'INSERT INTO attempts (user, category, level, image, score, passed, createdAt, strokes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (user, category, level, image, float(score), int(passed), createdAt, strokes))
+
+        if passed:
+            self.connection.execute(
+                'INSERT INTO completions (user, category, level, image, bestScore, completedAt) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (user, category, level, image) DO UPDATE SET bestScore = max(bestScore, excluded.bestScore)',
+                (user, category, level, image, float(score), createdAt))
+
+    # Set of the drawings the user has completed in a level
+    def completedSet(self, user, category, level):
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT image FROM completions WHERE user = ? AND category = ? AND level = ?',
+                (user, category, level)).fetchall()
+        return {row[0] for row in rows}
+
+    # All scored attempts of the user on a drawing, oldest first: [(score, passed, createdAt)]
+    def scoreHistory(self, user, category, level, image):
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT score, passed, createdAt FROM attempts WHERE user = ? AND category = ? AND level = ? AND image = ? ORDER BY id',
+                (user, category, level, image)).fetchall()
+        return [(score, bool(passed), createdAt) for score, passed, createdAt in rows]
+
+    # Encoded stroke logs of the user's attempts on a drawing, oldest first: [(score, passed, createdAt, strokes)]
+    # Decode them with strokeLog.StrokeLog.decode
+    def strokeLogs(self, user, category, level, image):
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT score, passed, createdAt, strokes FROM attempts WHERE user = ? AND category = ? AND level = ? AND image = ? AND strokes IS NOT NULL ORDER BY id',
+                (user, category, level, image)).fetchall()
+        return [(score, bool(passed), createdAt, strokes) for score, passed, createdAt, strokes in rows]
+
+    # One-time import of the old usersPath/<user>/<category>/<level>/<image>.txt score files
+    def migrateFromTextFiles(self, usersPath):
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'migratedTextFiles'").fetchone()
+        if row is not None:
+            return 0
+
+        migrated = 0
+        with self.lock, self.connection:
+            for root, dirs, files in os.walk(usersPath):
+                parts = os.path.relpath(root, usersPath).split(os.sep)
+                if len(parts) != 3:
+                    continue
+                user, category, level = parts
+
+                for f in files:
+                    if not f.endswith('.txt'):
+                        continue
+                    path = os.path.join(root, f)
+                    try:
+                        with open(path, 'r') as scoreFile:
+                            score = float(scoreFile.read())
+                    except (OSError, ValueError):
+                        continue
+
+                    # Only passing scores were ever written to text files
+                    self.insertScore(user, category, level, f[0:-4], score, True, os.path.getmtime(path))
+                    migrated += 1
+
+            self.connection.execute("INSERT INTO meta (key, value) VALUES ('migratedTextFiles', ?)", (str(migrated),))
+
+        return migrated
+
+    # Move the WAL into the database file and sync it to disk
+    def checkpoint(self):
+        with self.lock:
+            self.connection.execute('PRAGMA wal_checkpoint(FULL)')
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
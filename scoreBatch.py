@@ -0,0 +1,93 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import scoring
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+FIELDS = ['name', 'template', 'sketch', 'matchPixels', 'nonMatchPixels', 'totalPixels', 'score', 'passed']
+
+
+# Images in a directory by file name without extension
+def listImages(directory):
+    images = {}
+    for f in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(f)
+        if ext.lower() in IMAGE_EXTENSIONS:
+            images[name] = os.path.join(directory, f)
+    return images
+
+
+# Runs in a worker process
+def scorePair(name, templatePath, sketchPath, scoreThresh, tolerance):
+    row = {'name': name, 'template': templatePath, 'sketch': sketchPath}
+    try:
+        row.update(scoring.scoreImageFiles(templatePath, sketchPath, tolerance))
+        row['passed'] = row['score'] >= scoreThresh
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+# Setting from a text file of the kiosk, or default
+def readSetting(path, default):
+    try:
+        with open(path, 'r') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return default
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score sketches against their templates, without the kiosk UI.")
+    parser.add_argument('templates', help="directory of template images")
+    parser.add_argument('sketches', help="directory of sketch images, matched to templates by file name")
+    parser.add_argument('--threshold', type=int, default=None, help="passing score (default: scorethresh.txt, or 30)")
+    parser.add_argument('--tolerance', type=int, default=None, help="distance tolerance in pixels, 0 for exact overlap (default: scoretolerance.txt, or 0)")
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    scoreThresh = args.threshold if args.threshold is not None else readSetting('scorethresh.txt', 30)
+    tolerance = args.tolerance if args.tolerance is not None else readSetting('scoretolerance.txt', 0)
+
+    templates = listImages(args.templates)
+    sketches = listImages(args.sketches)
+    names = [name for name in sketches if name in templates]
+    for name in sketches:
+        if name not in templates:
+            print("No template for sketch:", sketches[name], file=sys.stderr)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        rows = list(executor.map(scorePair, names, [templates[n] for n in names], [sketches[n] for n in names], [scoreThresh] * len(names), [tolerance] * len(names), chunksize=16))
+
+    failed = 0
+    for row in rows:
+        if 'error' in row:
+            failed += 1
+            print("Could not score", row['name'] + ":", row['error'], file=sys.stderr)
+    rows = [row for row in rows if 'error' not in row]
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        if args.format == 'json':
+            json.dump(rows, output, indent=2)
+            output.write('\n')
+        else:
+            writer = csv.DictWriter(output, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
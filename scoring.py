@@ -0,0 +1,175 @@
+from lazyImport import lazyImport
+import numpy as np
+from sketchMask import INK, binarize, packInk, popcount
+
+# Imported on first use, off the startup path
+cv2 = lazyImport('cv2')
+
+
+# Count the pixels needed for the score in one pass over the masks, without modifying them
+# Returns (matchPixels, nonMatchPixels, totalPixels):
+# - matchPixels: ink on both the drawing and the sketch
+# - nonMatchPixels: ink on the sketch outside of the drawing
+# - totalPixels: ink on the drawing
+def countPixels(drawingMask, sketchMask):
+    size = drawingMask.size
+
+    # Ink is 0, so a pixel is ink on both masks only where their OR is 0
+    matchPixels = size - cv2.countNonZero(cv2.bitwise_or(drawingMask, sketchMask))
+    sketchPixels = size - cv2.countNonZero(sketchMask)
+    totalPixels = size - cv2.countNonZero(drawingMask)
+
+    return matchPixels, sketchPixels - matchPixels, totalPixels
+
+
+# Same counts on ink bitplanes produced by sketchMask.packInk
+def countPackedPixels(drawingPacked, sketchPacked):
+    matchPixels = popcount(drawingPacked & sketchPacked)
+    sketchPixels = popcount(sketchPacked)
+    totalPixels = popcount(drawingPacked)
+
+    return matchPixels, sketchPixels - matchPixels, totalPixels
+
+
+# Distance in pixels from every pixel to the nearest ink pixel of the drawing,
+# rounded and capped at 255 so it takes as much memory as the mask
+def distanceTransform(drawingMask):
+    # cv2.distanceTransform measures the distance to the nearest zero pixel, and ink is 0
+    distance = cv2.distanceTransform(drawingMask, cv2.DIST_L2, 3)
+    return np.minimum(np.rint(distance), 255).astype(np.uint8)
+
+
+# Tolerant version of countPixels: ink within tolerance pixels of a line counts as on it
+# - matchPixels: ink on the drawing within tolerance of the sketch
+# - nonMatchPixels: ink on the sketch farther than tolerance from the drawing
+#   (one lookup in the precomputed distance map per sketch pixel)
+# - totalPixels: ink on the drawing
+# With tolerance 0 this gives the same counts as countPixels
+def countTolerantPixels(drawingMask, drawingDistance, sketchMask, tolerance):
+    size = drawingMask.size
+    sketchInk = sketchMask == INK
+
+    nonMatchPixels = int(np.count_nonzero(drawingDistance[sketchInk] > tolerance))
+
+    # Grow the sketch by the tolerance and count the drawing ink it covers
+    if tolerance > 0:
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * tolerance + 1, 2 * tolerance + 1))
+        sketchMask = cv2.erode(sketchMask, kernel)
+    matchPixels = size - cv2.countNonZero(cv2.bitwise_or(drawingMask, sketchMask))
+
+    totalPixels = size - cv2.countNonZero(drawingMask)
+
+    return matchPixels, nonMatchPixels, totalPixels
+
+
+# Score in percent from the pixel counts
+def computeScore(matchPixels, nonMatchPixels, totalPixels):
+    if totalPixels == 0:
+        return 0
+
+    score = ((matchPixels - nonMatchPixels) / totalPixels) * 100
+
+    if score < 0:
+        score = 0
+
+    return score
+
+
+def scoreMasks(drawingMask, sketchMask):
+    return computeScore(*countPixels(drawingMask, sketchMask))
+
+
+def scorePacked(drawingMask, sketchMask):
+    return computeScore(*countPackedPixels(packInk(drawingMask), packInk(sketchMask)))
+
+
+# Read an image file as a black and white mask, resized to (width, height) if given
+def loadMask(path, size=None):
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise IOError(f"Could not read image: {path}")
+
+    if size is not None and (img.shape[1], img.shape[0]) != size:
+        img = cv2.resize(img, size)
+
+    return binarize(img)
+
+
+# Score a sketch image against a template image, the template is resized to the sketch
+# like startDrawing resizes it to the drawing area
+# With a tolerance > 0 the distance-tolerant counts are used
+def scoreImageFiles(templatePath, sketchPath, tolerance=0):
+    sketchMask = loadMask(sketchPath)
+    drawingMask = loadMask(templatePath, (sketchMask.shape[1], sketchMask.shape[0]))
+
+    if tolerance > 0:
+        counts = countTolerantPixels(drawingMask, distanceTransform(drawingMask), sketchMask, tolerance)
+    else:
+        counts = countPixels(drawingMask, sketchMask)
+
+    matchPixels, nonMatchPixels, totalPixels = counts
+    return {
+        'matchPixels': matchPixels,
+        'nonMatchPixels': nonMatchPixels,
+        'totalPixels': totalPixels,
+        'score': computeScore(matchPixels, nonMatchPixels, totalPixels),
+    }
+
+
+# Running match / non-match counters of a sketch, kept up to date stroke by stroke
+# Call measure() on the dirty rectangle before and after drawing in it, then update()
+# Gives the same counts as countPixels (or countTolerantPixels with a tolerance)
+class IncrementalScorer:
+    def __init__(self, drawingMask, drawingDistance=None, tolerance=0):
+        self.drawingMask = drawingMask
+        self.tolerance = tolerance
+        self.height, self.width = drawingMask.shape
+
+        # Where sketch ink is a non-match (255): off the drawing, or farther than the tolerance from it
+        if tolerance > 0:
+            self.farMask = np.where(drawingDistance > tolerance, 255, 0).astype(np.uint8)
+            self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * tolerance + 1, 2 * tolerance + 1))
+        else:
+            self.farMask = drawingMask
+            self.kernel = None
+
+        self.totalPixels = drawingMask.size - cv2.countNonZero(drawingMask)
+        self.matchPixels = 0
+        self.nonMatchPixels = 0
+
+    def counts(self):
+        return self.matchPixels, self.nonMatchPixels, self.totalPixels
+
+    def score(self):
+        return computeScore(self.matchPixels, self.nonMatchPixels, self.totalPixels)
+
+    # Rectangle grown by margin pixels, clipped to the canvas
+    def expand(self, rect, margin):
+        x0, y0, x1, y1 = rect
+        return (max(x0 - margin, 0), max(y0 - margin, 0), min(x1 + margin, self.width), min(y1 + margin, self.height))
+
+    # (covered drawing pixels, non-matching sketch pixels) affected by changes inside rect
+    def measure(self, sketchMask, rect):
+        x0, y0, x1, y1 = rect
+        sketch = sketchMask[y0:y1, x0:x1]
+        nonMatchPixels = cv2.countNonZero(cv2.bitwise_and(self.farMask[y0:y1, x0:x1], cv2.bitwise_not(sketch)))
+
+        # Drawing pixels covered by the sketch grown by the tolerance, within reach of rect
+        cx0, cy0, cx1, cy1 = self.expand(rect, self.tolerance)
+        grown = sketchMask[cy0:cy1, cx0:cx1]
+        if self.kernel is not None:
+            # The grown sketch is exact up to tolerance pixels from the edges of the context
+            gx0, gy0, gx1, gy1 = self.expand(rect, 2 * self.tolerance)
+            grown = cv2.erode(sketchMask[gy0:gy1, gx0:gx1], self.kernel)[cy0 - gy0:cy1 - gy0, cx0 - gx0:cx1 - gx0]
+        region = cv2.bitwise_or(self.drawingMask[cy0:cy1, cx0:cx1], grown)
+        matchPixels = region.size - cv2.countNonZero(region)
+
+        return matchPixels, nonMatchPixels
+
+    def update(self, before, after):
+        self.matchPixels += after[0] - before[0]
+        self.nonMatchPixels += after[1] - before[1]
+
+    # Recount everything from a full sketch
+    def recount(self, sketchMask):
+        self.matchPixels, self.nonMatchPixels = self.measure(sketchMask, (0, 0, self.width, self.height))
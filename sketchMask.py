@@ -0,0 +1,44 @@
+from lazyImport import lazyImport
+import numpy as np
+
+# Imported on first use, off the startup path
+cv2 = lazyImport('cv2')
+
+
+# Templates and sketches are single-channel uint8 masks: 0 is ink, 255 is paper
+INK = 0
+PAPER = 255
+
+# Number of set bits for every byte value
+POPCOUNT8 = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+# Blank (all paper) mask
+def blankMask(width, height):
+    return np.full((height, width), PAPER, np.uint8)
+
+
+# Convert a grayscale or BGR image to a pure black and white mask
+def binarize(img):
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(img, 127, PAPER, cv2.THRESH_BINARY)
+    return mask
+
+
+# Pack the ink pixels of a mask into a flat bitplane, 8 pixels per byte
+def packInk(mask):
+    return np.packbits(mask.ravel() == INK)
+
+
+# Unpack a bitplane produced by packInk back into a mask of the given size
+def unpackInk(packed, width, height):
+    ink = np.unpackbits(packed, count=width * height).reshape(height, width)
+    return np.where(ink, INK, PAPER).astype(np.uint8)
+
+
+# Number of set bits in a packed bitplane
+def popcount(packed):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(packed).sum(dtype=np.int64))
+    return int(POPCOUNT8[packed].sum(dtype=np.int64))
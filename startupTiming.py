@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+from lazyImport import LAZY_MODULES
+
+
+# Enabled with --startup-timing on the command line or STARTUP_TIMING=1 in the environment
+ENABLED = '--startup-timing' in sys.argv or os.environ.get('STARTUP_TIMING') == '1'
+
+# Time of the first import of this module, the origin of all marks
+START = time.perf_counter()
+
+# (name, seconds since START) in the order they were marked
+marks = []
+
+
+# Record the end of a startup step
+def mark(name):
+    if ENABLED:
+        marks.append((name, time.perf_counter() - START))
+
+
+# Print the duration of every step, and the lazy imports resolved so far
+def report():
+    if not ENABLED:
+        return
+
+    print('Startup timing:')
+    previous = 0.0
+    for name, elapsed in marks:
+        print(f'  {name:<32} {1000 * (elapsed - previous):8.1f} ms  (at {1000 * elapsed:8.1f} ms)')
+        previous = elapsed
+
+    for name, module in sorted(LAZY_MODULES.items()):
+        if module.isLoaded():
+            print(f'  lazy import {name:<20} {1000 * module.loadSeconds:8.1f} ms')
+        else:
+            print(f'  lazy import {name:<20}      not loaded')
@@ -0,0 +1,145 @@
+import time
+import zlib
+import struct
+from array import array
+from lazyImport import lazyImport
+import numpy as np
+from sketchMask import INK, PAPER, blankMask
+
+# Imported on first use, off the startup path
+cv2 = lazyImport('cv2')
+
+
+# Tool of a stroke
+TOOL_PENCIL = 0
+TOOL_ERASER = 1
+
+# Undo and redo are logged as strokes with a single point (index of the stroke undone / redone, 0)
+TOOL_UNDO = 2
+TOOL_REDO = 3
+
+TOOLS = {'pencil': TOOL_PENCIL, 'eraser': TOOL_ERASER}
+
+MAGIC = b'STRK'
+VERSION = 1
+
+# magic, version, canvas width, canvas height, stroke width, stroke count, point count
+HEADER = struct.Struct('<4sBHHBII')
+
+
+# The strokes of one attempt: points, timestamps and tool of every stroke
+# Kept in flat arrays while drawing, stored delta-encoded and compressed
+class StrokeLog:
+    def __init__(self, width, height, strokeWidth):
+        self.width = width
+        self.height = height
+        self.strokeWidth = strokeWidth
+
+        # Per stroke
+        self.tools = array('B')
+        self.pointCounts = array('I')
+
+        # Per point: position and ms since the start of the attempt
+        self.xs = array('h')
+        self.ys = array('h')
+        self.times = array('I')
+
+        self.startTime = time.monotonic()
+
+    # Returns the index of the new stroke
+    def beginStroke(self, tool, x, y):
+        self.tools.append(TOOLS[tool])
+        self.pointCounts.append(0)
+        self.addPoint(x, y)
+        return len(self.tools) - 1
+
+    def logUndo(self, strokeIndex):
+        self.tools.append(TOOL_UNDO)
+        self.pointCounts.append(0)
+        self.addPoint(strokeIndex, 0)
+
+    def logRedo(self, strokeIndex):
+        self.tools.append(TOOL_REDO)
+        self.pointCounts.append(0)
+        self.addPoint(strokeIndex, 0)
+
+    def addPoint(self, x, y):
+        if not self.pointCounts:
+            return
+        self.xs.append(x)
+        self.ys.append(y)
+        self.times.append(int((time.monotonic() - self.startTime) * 1000))
+        self.pointCounts[-1] += 1
+
+    # Points of every stroke: [(tool, points as an (n, 2) int32 array)]
+    def strokes(self):
+        points = np.stack([np.frombuffer(self.xs, np.int16), np.frombuffer(self.ys, np.int16)], axis=1).astype(np.int32)
+        ends = np.cumsum(np.frombuffer(self.pointCounts, np.uint32))
+        starts = ends - np.frombuffer(self.pointCounts, np.uint32)
+        return [(tool, points[start:end]) for tool, start, end in zip(self.tools, starts, ends)]
+
+    # Rasterize the strokes again, at the original size or any other
+    def replay(self, width=None, height=None):
+        width = width or self.width
+        height = height or self.height
+        scaleX = width / self.width
+        scaleY = height / self.height
+        strokeWidth = max(int(round(self.strokeWidth * (scaleX + scaleY) / 2)), 1)
+
+        strokes = self.strokes()
+
+        # Undo always reverts the latest strokes, so the result is the strokes never left undone, in order
+        undone = set()
+        for tool, points in strokes:
+            if tool == TOOL_UNDO:
+                undone.add(int(points[0][0]))
+            elif tool == TOOL_REDO:
+                undone.discard(int(points[0][0]))
+
+        sketch = blankMask(width, height)
+        for strokeIndex, (tool, points) in enumerate(strokes):
+            if tool not in (TOOL_PENCIL, TOOL_ERASER) or strokeIndex in undone or len(points) < 2:
+                continue
+            scaled = np.rint(points * (scaleX, scaleY)).astype(np.int32)
+            cv2.polylines(sketch, [scaled], False, INK if tool == TOOL_PENCIL else PAPER, strokeWidth)
+        return sketch
+
+    def encode(self):
+        header = HEADER.pack(MAGIC, VERSION, self.width, self.height, self.strokeWidth, len(self.tools), len(self.xs))
+
+        # Consecutive points are close together, so their deltas compress well
+        xs = np.frombuffer(self.xs, np.int16)
+        ys = np.frombuffer(self.ys, np.int16)
+        times = np.frombuffer(self.times, np.uint32)
+        body = b''.join([
+            self.tools.tobytes(),
+            self.pointCounts.tobytes(),
+            np.diff(xs, prepend=np.int16(0)).astype('<i2').tobytes(),
+            np.diff(ys, prepend=np.int16(0)).astype('<i2').tobytes(),
+            np.diff(times, prepend=np.uint32(0)).astype('<u4').tobytes(),
+        ])
+
+        return header + zlib.compress(body, 9)
+
+    @classmethod
+    def decode(cls, data):
+        magic, version, width, height, strokeWidth, strokeCount, pointCount = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a stroke log")
+
+        body = zlib.decompress(data[HEADER.size:])
+        offset = 0
+
+        def take(dtype, count):
+            nonlocal offset
+            values = np.frombuffer(body, dtype, count, offset)
+            offset += values.nbytes
+            return values
+
+        log = cls(width, height, strokeWidth)
+        log.tools = array('B', take('u1', strokeCount).tobytes())
+        log.pointCounts = array('I', take('<u4', strokeCount).astype(np.uint32).tobytes())
+        log.xs = array('h', np.cumsum(take('<i2', pointCount), dtype=np.int16).tobytes())
+        log.ys = array('h', np.cumsum(take('<i2', pointCount), dtype=np.int16).tobytes())
+        log.times = array('I', np.cumsum(take('<u4', pointCount), dtype=np.uint32).tobytes())
+        return log
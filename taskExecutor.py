@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+
+# Runs blocking work (disk, decoding) on worker threads and delivers the result back on the GUI thread
+# - run(fn, *args, onResult=..., onError=...) returns at once, the callbacks run later in the event loop
+# - busy tasks count towards busyChanged, used by the window to show the busy indicator
+class TaskExecutor(QObject):
+    # (task, future), emitted from the worker thread
+    finished = pyqtSignal(object, object)
+
+    # True when the first busy task starts, False when the last one ends
+    busyChanged = pyqtSignal(bool)
+
+    def __init__(self, maxWorkers=2, parent=None):
+        super().__init__(parent)
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers)
+        self.busyTasks = 0
+
+        # Always queued, so callbacks never run inside run() even when the task is already done
+        self.finished.connect(self.onFinished, Qt.QueuedConnection)
+
+    def run(self, fn, *args, onResult=None, onError=None, busy=True):
+        task = {'onResult': onResult, 'onError': onError, 'busy': busy}
+
+        if busy:
+            self.busyTasks += 1
+            if self.busyTasks == 1:
+                self.busyChanged.emit(True)
+
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda future: self.finished.emit(task, future))
+        return future
+
+    def isBusy(self):
+        return self.busyTasks > 0
+
+    # Runs on the GUI thread
+    def onFinished(self, task, future):
+        if task['busy']:
+            self.busyTasks -= 1
+            if self.busyTasks == 0:
+                self.busyChanged.emit(False)
+
+        error = future.exception()
+        if error is not None:
+            if task['onError'] is not None:
+                task['onError'](error)
+            else:
+                print("Background task failed:", repr(error))
+            return
+
+        if task['onResult'] is not None:
+            task['onResult'](future.result())
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
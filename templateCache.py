@@ -0,0 +1,137 @@
+import os
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+from lazyImport import lazyImport
+import numpy as np
+from sketchMask import binarize, packInk, unpackInk
+import scoring
+
+# Imported on first use, off the startup path
+cv2 = lazyImport('cv2')
+
+
+# Decoded, resized and binarized tracing templates
+# - in memory: LRU of templates keyed by path + mtime + target size
+# - on disk: packed-bit .npy sidecars, so a cold start skips JPEG decoding
+# - the distance transform of a template is computed on first use and cached with it
+class TemplateCache:
+    def __init__(self, cacheDir, maxEntries=16):
+        self.cacheDir = cacheDir
+        self.maxEntries = maxEntries
+
+        # key -> {'mask': mask, 'distance': distance map or None}
+        self.entries = OrderedDict()
+
+        # Templates are also loaded from the prefetch thread
+        self.lock = threading.Lock()
+        os.makedirs(self.cacheDir, exist_ok=True)
+
+    def key(self, path, width, height):
+        return (os.path.abspath(path), os.stat(path).st_mtime_ns, width, height)
+
+    # Sidecar file names: <path hash>_<width>x<height>_<mtime>.npy (mask) and .dist.npy (distance map)
+    def sidecarPrefix(self, key):
+        path, mtime, width, height = key
+        return os.path.join(self.cacheDir, hashlib.sha1(path.encode('utf-8')).hexdigest()[:16] + f'_{width}x{height}_')
+
+    def sidecarPath(self, key, suffix='.npy'):
+        return self.sidecarPrefix(key) + f'{key[1]}' + suffix
+
+    # Get the template mask for the image at path, resized to width x height
+    # The returned mask is shared and read-only, copy it before drawing on it
+    def get(self, path, width, height):
+        with self.lock:
+            return self.entry(path, width, height)['mask']
+
+    # Get the distance of every pixel to the nearest template line (uint8, read-only)
+    def getDistance(self, path, width, height):
+        with self.lock:
+            entry = self.entry(path, width, height)
+            if entry['distance'] is None:
+                key = self.key(path, width, height)
+                distance = self.loadDistanceSidecar(key)
+                if distance is None:
+                    distance = scoring.distanceTransform(entry['mask'])
+                    self.saveSidecar(key, distance, '.dist.npy')
+                distance.flags.writeable = False
+                entry['distance'] = distance
+            return entry['distance']
+
+    # Must be called with the lock held
+    def entry(self, path, width, height):
+        key = self.key(path, width, height)
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+
+        mask = self.loadMaskSidecar(key)
+        if mask is None:
+            mask = self.build(path, width, height)
+            self.removeStaleSidecars(key)
+            self.saveSidecar(key, packInk(mask))
+
+        mask.flags.writeable = False
+        entry = {'mask': mask, 'distance': None}
+        self.entries[key] = entry
+
+        # Evict the least recently used templates
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+
+        return entry
+
+    def build(self, path, width, height):
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise IOError(f"Could not read image: {path}")
+
+        # Resize the image to the target size and convert it to pure black and white
+        img = cv2.resize(img, (width, height))
+        return binarize(img)
+
+    def loadMaskSidecar(self, key):
+        packed = self.loadSidecar(key, '.npy')
+        if packed is None:
+            return None
+        try:
+            return unpackInk(packed, key[2], key[3])
+        except ValueError:
+            return None
+
+    def loadDistanceSidecar(self, key):
+        distance = self.loadSidecar(key, '.dist.npy')
+        if distance is None or distance.shape != (key[3], key[2]):
+            return None
+        return distance
+
+    def loadSidecar(self, key, suffix):
+        sidecarPath = self.sidecarPath(key, suffix)
+        if not os.path.exists(sidecarPath):
+            return None
+
+        try:
+            return np.load(sidecarPath)
+        except (OSError, ValueError):
+            return None
+
+    # Remove sidecars of older versions of the same image at this size
+    def removeStaleSidecars(self, key):
+        current = self.sidecarPath(key, '')
+        for oldPath in glob.glob(glob.escape(self.sidecarPrefix(key)) + '*.npy'):
+            if not oldPath.startswith(current + '.'):
+                os.remove(oldPath)
+
+    def saveSidecar(self, key, array, suffix='.npy'):
+        # Write to a temporary file first so a crash never leaves a partial sidecar
+        sidecarPath = self.sidecarPath(key, suffix)
+        tmpPath = sidecarPath + '.tmp'
+        try:
+            with open(tmpPath, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmpPath, sidecarPath)
+        except OSError:
+            pass
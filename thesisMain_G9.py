@@ -1,20 +1,40 @@
 import os
-import cv2
 import sys
-import serial
+import time
+import startupTiming
 import shutil
 import numpy as np
-from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QPushButton, QLineEdit, QPlainTextEdit
-from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QMessageBox, QPushButton, QLineEdit, QPlainTextEdit, QLabel
+from PyQt5.QtCore import QTimer, Qt, QRectF
 from PyQt5 import uic
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtGui import QImage, QPixmap, QPainter
 from functools import partial
-from pydub import AudioSegment, playback
+from canvasCompositor import CanvasCompositor
+from sketchMask import INK, PAPER, blankMask, binarize
+import scoring
+from templateCache import TemplateCache
+from contentCatalog import ContentCatalog
+from progressStore import ProgressStore
+from persistenceQueue import PersistenceQueue
+from completionTracker import CompletionTracker
+from dispenser import DispenserDriver
+from strokeLog import StrokeLog
+from undoStack import UndoStack
+from audioPlayer import AudioPlayer, AudioCache, writeWavSidecar, wavSidecarPath
+from lazyImport import lazyImport, LAZY_MODULES
+from taskExecutor import TaskExecutor
+import instrumentation
+from instrumentation import timed
+
+# Imported on first use, off the startup path
+cv2 = lazyImport('cv2')
 
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 
 import resources
 
+startupTiming.mark('imports')
+
 OS_LINUX = 'linux'
 OS_WINDOWS = 'windows'
 OS_MACOS = 'macos'
@@ -26,6 +46,14 @@ elif sys.platform == 'win32':
 elif sys.platform == 'darwin':
     OS = OS_MACOS
 
+# Largest distance tolerance of the score, in pixels (0 scores exact pixel overlap)
+MAX_SCORE_TOLERANCE = 20
+
+# Bounds of each side of the working resolution, in pixels
+# (stroke logs store coordinates as int16, and the stroke width is in working pixels)
+MIN_WORKING_SIZE = 64
+MAX_WORKING_SIZE = 4096
+
 
 # Instantiate main pyqt5 window
 class MainWindow(QMainWindow):
@@ -35,24 +63,52 @@ class MainWindow(QMainWindow):
         # Parameters
         self.databasePath = "../../database"
         self.usersPath = "../../users"
+        self.cachePath = "../../cache"
+        self.logsPath = "../../logs"
         os.makedirs(self.databasePath, exist_ok=True)
         os.makedirs(self.usersPath, exist_ok=True)
         if not os.path.exists('scorethresh.txt'):
             with open('scorethresh.txt', 'w') as f:
                 f.write('30')
+        # Distance tolerance of the score in pixels, 0 scores exact pixel overlap
+        if not os.path.exists('scoretolerance.txt'):
+            with open('scoretolerance.txt', 'w') as f:
+                f.write('0')
+        # Internal resolution of the canvas, WIDTHxHEIGHT (e.g. 1024x600) or auto for the drawingArea size
+        if not os.path.exists('workingsize.txt'):
+            with open('workingsize.txt', 'w') as f:
+                f.write('auto')
+
+        # Image shown (or being read) on the drawing preview of the manage page
+        self.previewPath = None
+
+        # The current drawing that needs to be traced (single-channel mask)
+        self.currentDrawing = None
 
-        # Serial object
-        if OS == OS_LINUX:
-            self.serial = serial.Serial('/dev/ttyACM0', 9600)
+        # Decoded and binarized templates, in memory and on disk
+        self.templateCache = TemplateCache(os.path.join(self.cachePath, 'templates'))
 
-        # The current drawing that needs to be traced
-        self.currentDrawing = None
+        # Worker threads for disk reads, copies and deletes, results are delivered on the GUI thread
+        self.tasks = TaskExecutor(parent=self)
+
+        # Decoded feedback audio, and the player using it off the GUI thread
+        self.audioCache = AudioCache()
+        self.audioPlayer = AudioPlayer(self.audioCache, self)
         
-        # The current sketch of the child
+        # The current sketch of the child (single-channel mask)
         self.childSketch = None
 
-        # The combined image of the currentDrawing and the image
-        self.combinedImage = None
+        # Compositor holding the combined image of the currentDrawing and the child sketch
+        self.compositor = None
+
+        # Score of the child sketch, updated while drawing
+        self.liveScorer = None
+
+        # Strokes of the current attempt
+        self.strokeLog = None
+
+        # Undo / redo of the strokes of the current attempt
+        self.undoStack = UndoStack()
 
         # Drawing State
         self.isDrawing = False
@@ -63,8 +119,20 @@ class MainWindow(QMainWindow):
         # Gray value for the combined image
         self.grayValue = 0
 
-        # For this window, load the UI from gui.ui file
-        uic.loadUi('thesisUi.ui', self)
+        # Internal resolution (width, height) of templates and sketches, from workingsize.txt
+        # None uses the size of the drawingArea; a fixed size caps the per-stroke and per-score
+        # cost on high-DPI panels and makes scores comparable across kiosk models
+        self.loadWorkingSize()
+
+        # Stroke width of the pencil and the eraser, in working resolution pixels
+        self.strokeWidth = 8
+
+        # Points received since the last frame, rasterized together once per frame
+        self.pendingPoints = []
+
+        # For this window, load the UI (precompiled when available)
+        self.setupUi()
+        startupTiming.mark('load UI')
 
         # Reset the drawing area
         self.resetDrawingArea()
@@ -77,12 +145,37 @@ class MainWindow(QMainWindow):
             self.scoreThresh = int(f.read())
         self.editScoreThresh.setText(str(self.scoreThresh))
 
+        # Load score tolerance
+        self.loadScoreTolerance()
+
         # Create a function for the drawingArea to handle click and drag events
         # Draw the path taken by the mouse while dragging
         self.drawingArea.mouseMoveEvent = self.mouseMoveEvent
         self.drawingArea.mousePressEvent = self.mousePressEvent
         self.drawingArea.mouseReleaseEvent = self.mouseReleaseEvent
 
+        # The drawingArea paints straight from the compositor canvas
+        self.drawingArea.clear()
+        self.drawingArea.paintEvent = self.drawingAreaPaintEvent
+
+        # Frame timer: strokes are rasterized and repainted at most once per display refresh
+        refreshRate = QApplication.primaryScreen().refreshRate() or 60
+        self.frameTimer = QTimer(self)
+        self.frameTimer.setInterval(max(int(1000 / refreshRate), 1))
+        self.frameTimer.timeout.connect(self.flushStroke)
+
+        # Latency histograms are appended to a rotating log every 10 minutes, and on quit
+        self.latencyTimer = QTimer(self)
+        self.latencyTimer.setInterval(10 * 60 * 1000)
+        self.latencyTimer.timeout.connect(self.dumpLatency)
+        self.latencyTimer.start()
+
+        # Busy indicator while a blocking task runs in the background
+        self.tasks.busyChanged.connect(self.setBusy)
+
+        # The database, the progress store and the dispenser are opened once the home page is shown
+        QTimer.singleShot(0, self.finishStartup)
+
         # ============== Home Page ==============
         self.btnStart.clicked.connect(lambda: self.stackedWidget.setCurrentWidget(self.pgEnterName))
         self.btnManage.clicked.connect(self.loginAsAdmin)
@@ -137,6 +230,26 @@ class MainWindow(QMainWindow):
 
         self.btnManageScoreThresh.clicked.connect(self.updateScoreThresh)
 
+        # Score tolerance, below the score threshold with the same look
+        toleranceOffset = self.btnManageScoreThresh.height() + 10
+        self.editScoreTolerance = QLineEdit(str(self.scoreTolerance), self.editScoreThresh.parentWidget())
+        self.editScoreTolerance.setGeometry(self.editScoreThresh.geometry().translated(0, toleranceOffset))
+        self.editScoreTolerance.setFont(self.editScoreThresh.font())
+        self.editScoreTolerance.setStyleSheet(self.editScoreThresh.styleSheet())
+        self.editScoreTolerance.setPlaceholderText('Tolerance (px)')
+        self.btnManageScoreTolerance = QPushButton('Set Tolerance', self.btnManageScoreThresh.parentWidget())
+        self.btnManageScoreTolerance.setGeometry(self.btnManageScoreThresh.geometry().translated(0, toleranceOffset))
+        self.btnManageScoreTolerance.setFont(self.btnManageScoreThresh.font())
+        self.btnManageScoreTolerance.setStyleSheet(self.btnManageScoreThresh.styleSheet())
+        self.btnManageScoreTolerance.clicked.connect(self.updateScoreTolerance)
+
+        # Latency percentiles of the drawing, scoring and loading paths, left of the exit button
+        self.btnLatency = QPushButton('Latency', self.btnExitManage.parentWidget())
+        self.btnLatency.setGeometry(self.btnExitManage.geometry().translated(-self.btnExitManage.width() - 10, 0))
+        self.btnLatency.setFont(self.btnExitManage.font())
+        self.btnLatency.setStyleSheet(self.btnExitManage.styleSheet())
+        self.btnLatency.clicked.connect(self.showLatency)
+
         # =======================================
 
         # ============== Drawing Page ==============
@@ -144,11 +257,29 @@ class MainWindow(QMainWindow):
         self.btnChooseDraw.clicked.connect(self.setToolToPencil)
         self.btnChooseErase.clicked.connect(self.setToolToEraser)
         self.btnBackFromDrawing.clicked.connect(self.backFromDrawing)
+
+        # Undo and redo buttons, side by side in one row below the pencil and eraser buttons
+        self.btnUndo = QPushButton('Undo', self.btnChooseErase.parentWidget())
+        self.btnRedo = QPushButton('Redo', self.btnChooseErase.parentWidget())
+        for btn in [self.btnUndo, self.btnRedo]:
+            btn.setFont(self.btnChooseErase.font())
+            btn.setStyleSheet(self.btnChooseErase.styleSheet())
+        self.btnUndo.clicked.connect(self.undoStroke)
+        self.btnRedo.clicked.connect(self.redoStroke)
+
+        # Live score, in the header of the drawing area (placed by layoutDrawingControls)
+        self.lblLiveScore = QLabel('Score: 0', self.drawingArea.parentWidget())
+        self.lblLiveScore.setFont(self.btnChooseErase.font())
+        self.lblLiveScore.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        # Never take a touch meant for the drawing
+        self.lblLiveScore.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.shownLiveScore = None
+        self.layoutDrawingControls()
         # =======================================
         
         # ============== Job Well Done Page ==============
         self.btnContinueSuccess.clicked.connect(self.continueAfterSuccess)
-        self.btnPlayResult.clicked.connect(lambda: playback.play(self.currentAudio))
+        self.btnPlayResult.clicked.connect(self.audioPlayer.play)
         # =======================================
 
 
@@ -158,6 +289,7 @@ class MainWindow(QMainWindow):
         self.editNewLevel.mousePressEvent = lambda event: self.showKeyboard(self.editNewLevel)
         self.editNewDrawing.mousePressEvent = lambda event: self.showKeyboard(self.editNewDrawing)
         self.editScoreThresh.mousePressEvent = lambda event: self.showKeyboard(self.editScoreThresh)
+        self.editScoreTolerance.mousePressEvent = lambda event: self.showKeyboard(self.editScoreTolerance)
         self.editInstructions.mousePressEvent = lambda event: self.showKeyboard(self.editInstructions)
         self.editPassword.mousePressEvent = lambda event: self.showKeyboard(self.editPassword, password=True)
         # =======================================
@@ -247,6 +379,36 @@ class MainWindow(QMainWindow):
         self.stackedWidget.setCurrentWidget(self.pgKeyboard)
 
 
+    # The page takes the size of the window (full screen on the kiosk), lay the drawing controls out again
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Not before the controls exist (loading the UI may resize the window)
+        if hasattr(self, 'lblLiveScore'):
+            self.layoutDrawingControls()
+
+    # Place the controls created in code on the drawing page, inside the page even on a 600 px tall panel
+    def layoutDrawingControls(self):
+        margin = 10
+        erase = self.btnChooseErase.geometry()
+        pageHeight = self.btnChooseErase.parentWidget().height()
+
+        # Undo and redo share the width of the tool column, at most as tall as the tool buttons,
+        # and move up (over the gap below the eraser) rather than past the bottom of the page
+        buttonWidth = (erase.width() - margin) // 2
+        buttonHeight = min(erase.height(), max((pageHeight - erase.bottom()) // 2 - margin, 40))
+        buttonY = min(erase.bottom() + margin, pageHeight - buttonHeight - margin)
+        self.btnUndo.setGeometry(erase.x(), buttonY, buttonWidth, buttonHeight)
+        self.btnRedo.setGeometry(erase.x() + buttonWidth + margin, buttonY, buttonWidth, buttonHeight)
+
+        # Live score right-aligned above the drawing area, or over its top right corner
+        # when the drawing area starts at the top of the page
+        area = self.drawingArea.geometry()
+        labelHeight = self.lblLiveScore.fontMetrics().height() + margin
+        labelWidth = min(self.lblLiveScore.fontMetrics().horizontalAdvance('Score: 100') + 2 * margin, area.width())
+        labelY = area.y() - labelHeight if area.y() >= labelHeight else area.y()
+        self.lblLiveScore.setGeometry(area.right() + 1 - labelWidth, labelY, labelWidth, labelHeight)
+        self.lblLiveScore.raise_()
+
     def setToolToPencil(self):
         self.tool = 'pencil'
         # Set self.lblDrawEraseIndicator y position to 200 
@@ -294,6 +456,80 @@ class MainWindow(QMainWindow):
 
         msg.exec_()
 
+    # Read scoretolerance.txt, falling back to exact scoring (0) when it is not a valid tolerance
+    def loadScoreTolerance(self):
+        try:
+            with open('scoretolerance.txt', 'r') as f:
+                scoreTolerance = int(f.read())
+        except (OSError, ValueError):
+            scoreTolerance = -1
+
+        if scoreTolerance < 0 or scoreTolerance > MAX_SCORE_TOLERANCE:
+            print("Invalid scoretolerance.txt, using 0")
+            scoreTolerance = 0
+
+        self.scoreTolerance = scoreTolerance
+
+    # Read workingsize.txt: WIDTHxHEIGHT, or auto (or an invalid size) for the size of the drawingArea
+    def loadWorkingSize(self):
+        try:
+            with open('workingsize.txt', 'r') as f:
+                text = f.read().strip().lower()
+        except OSError:
+            text = 'auto'
+
+        self.workingSize = None
+        if text == 'auto':
+            return
+
+        try:
+            width, height = (int(value) for value in text.split('x'))
+        except ValueError:
+            print("Invalid workingsize.txt, using the drawingArea size:", text)
+            return
+
+        if not (MIN_WORKING_SIZE <= width <= MAX_WORKING_SIZE and MIN_WORKING_SIZE <= height <= MAX_WORKING_SIZE):
+            print(f"workingsize.txt must be between {MIN_WORKING_SIZE} and {MAX_WORKING_SIZE} pixels, using the drawingArea size:", text)
+            return
+
+        self.workingSize = (width, height)
+
+    def updateScoreTolerance(self):
+        # Validate
+        if len(self.editScoreTolerance.text()) == 0:
+            msg = QMessageBox()
+            msg.setWindowTitle("Error")
+            msg.setText("Please enter a number.")
+            msg.exec_()
+            return
+
+        try:
+            scoreTolerance = int(self.editScoreTolerance.text())
+        except ValueError:
+            msg = QMessageBox()
+            msg.setWindowTitle("Error")
+            msg.setText("Please enter a valid number.")
+            msg.exec_()
+            return
+
+        if scoreTolerance < 0 or scoreTolerance > MAX_SCORE_TOLERANCE:
+            msg = QMessageBox()
+            msg.setWindowTitle("Error")
+            msg.setText(f"Please enter a number between 0 and {MAX_SCORE_TOLERANCE}.")
+            msg.exec_()
+            return
+
+        with open('scoretolerance.txt', 'w') as f:
+            f.write(str(scoreTolerance))
+
+        self.scoreTolerance = scoreTolerance
+
+        msg = QMessageBox()
+        msg.setWindowTitle("Success")
+        msg.setText("Score tolerance updated successfully.")
+
+        msg.exec_()
+
 
 
 
@@ -319,6 +555,20 @@ class MainWindow(QMainWindow):
             self.scoreThresh = int(f.read())
         self.editScoreThresh.setText(str(self.scoreThresh))
 
+        # Update scoretolerance
+        self.loadScoreTolerance()
+        self.editScoreTolerance.setText(str(self.scoreTolerance))
+
+        # Update workingsize, used from the next drawing on
+        self.loadWorkingSize()
+
+        # Drawings may be added or deleted from here; commit the queued scores first,
+        # so the completion state is seeded again from an up to date store
+        # (the admin login is rare, and off the drawing path, so blocking here is fine)
+        if self.persistence.hasPending():
+            self.persistence.flush()
+        self.completion.clear()
+
         self.refreshManageCategories()
         self.stackedWidget.setCurrentWidget(self.pgManage)
     
@@ -356,36 +606,110 @@ class MainWindow(QMainWindow):
 
 
 
-    def calculateScore(self):
-        # Convert the image to pure black and white
-        self.currentDrawing[self.currentDrawing < 128] = 0
-        self.currentDrawing[self.currentDrawing >= 128] = 255
+    # Load the precompiled UI module (python compileUi.py) unless thesisUi.ui is newer,
+    # otherwise parse thesisUi.ui at runtime
+    def setupUi(self):
+        try:
+            import thesisUi_ui
+        except ImportError:
+            thesisUi_ui = None
 
-        self.childSketch[self.childSketch < 128] = 0
-        self.childSketch[self.childSketch >= 128] = 255
+        if thesisUi_ui is not None and (not os.path.exists('thesisUi.ui') or os.path.getmtime(thesisUi_ui.__file__) >= os.path.getmtime('thesisUi.ui')):
+            uiClass = next(value for name, value in vars(thesisUi_ui).items() if name.startswith('Ui_'))
+            ui = uiClass()
+            ui.setupUi(self)
 
-        # Perform AND(NOT, NOT) operation
-        matches = cv2.bitwise_and(cv2.bitwise_not(self.currentDrawing), cv2.bitwise_not(self.childSketch))
+            # uic.loadUi sets the widgets on the window itself, do the same
+            self.__dict__.update(vars(ui))
+        else:
+            uic.loadUi('thesisUi.ui', self)
 
-        # Perform AND( , NOT) operation
-        nonMatches = cv2.bitwise_and(self.currentDrawing, cv2.bitwise_not(self.childSketch))
+    # Startup work that is not needed to show the home page
+    def finishStartup(self):
+        startupTiming.mark('home page shown')
 
-        # Get the number of matched pixels in the result
-        matchPixels = np.sum(matches[:,:,0] == 255)
+        # Prize dispenser, connected and driven from its own thread
+        if OS == OS_LINUX:
+            self.dispenser = DispenserDriver('/dev/ttyACM0', 9600)
 
-        # Get the number of non-matched pixels in the result
-        nonMatchPixels = np.sum(nonMatches[:,:,0] == 255)
+        # Scores and completed drawings of every user (imports the old score text files once)
+        self.progressStore = ProgressStore(os.path.join(self.usersPath, 'progress.db'))
+        self.progressStore.migrateFromTextFiles(self.usersPath)
 
-        # Get the number of total pixels in the currentDrawing
-        totalPixels = np.sum(self.currentDrawing[:,:,0] == 0)
+        # Progress writes are committed in the background, in batches
+        self.persistence = PersistenceQueue(self.progressStore)
+
+        # Index of the categories, levels and drawings in the database
+        self.catalog = ContentCatalog(self.databasePath, os.path.join(self.cachePath, 'catalog.json'))
+
+        # Completed drawings per user and level, for check marks and the prize dispenser
+        self.completion = CompletionTracker(self.catalog, self.progressStore)
+
+        startupTiming.mark('open database')
+
+        # Commit all queued progress when the application quits
+        QApplication.instance().aboutToQuit.connect(self.persistence.close)
+        QApplication.instance().aboutToQuit.connect(self.dumpLatency)
+        if OS == OS_LINUX:
+            QApplication.instance().aboutToQuit.connect(lambda: self.dispenser.close(timeout=5))
 
-        # Calculate the score
-        score = ((matchPixels - nonMatchPixels) / totalPixels) * 100
+        # Import cv2 in the background, before the first drawing needs it
+        self.tasks.run(LAZY_MODULES['cv2'].load, busy=False)
 
-        if score < 0:
-            score = 0
+        startupTiming.report()
+
+    # Wait cursor, and no input on the current page, while a busy task runs
+    def setBusy(self, busy):
+        if busy:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+        else:
+            QApplication.restoreOverrideCursor()
+        self.stackedWidget.setEnabled(not busy)
+
+    def dumpLatency(self):
+        try:
+            instrumentation.dump(os.path.join(self.logsPath, 'latency.log'))
+        except OSError as e:
+            print("Could not write the latency log:", e)
+
+    def showLatency(self):
+        msg = QMessageBox()
+        msg.setWindowTitle("Latency (ms)")
+        msg.setTextFormat(Qt.RichText)
+        msg.setText('<pre>' + instrumentation.report() + '</pre>')
+        msg.exec_()
+
+    # Show an error raised by a background task
+    def showTaskError(self, text, error):
+        print(text, repr(error))
+        msg = QMessageBox()
+        msg.setWindowTitle("Error")
+        msg.setText(f"{text}\n{error}")
+        msg.exec_()
+
+    def calculateScore(self):
+        # No drawing loaded (still loading, or it failed to load)
+        if self.liveScorer is None:
+            return
+
+        # Only the scoring is timed, not the dialogs that wait for the child
+        with timed('calculateScore'):
+            # Draw any points not rasterized yet
+            self.flushStroke()
+
+            # Matched, non-matched and total pixels, counted while the child was drawing
+            matchPixels, nonMatchPixels, totalPixels = self.liveScorer.counts()
+
+            # Calculate the score
+            score = scoring.computeScore(matchPixels, nonMatchPixels, totalPixels)
+
+            # Strokes of this attempt, stored with its score
+            strokes = self.strokeLog.encode()
         
         if score < self.scoreThresh:
+            # Keep the failed attempt in the score history
+            self.persistence.recordScore(self.currentUser, self.currentCategory, self.currentLevel, self.currentImage, score, False, strokes)
+
             # Display try again
             msg = QMessageBox()
             msg.setWindowTitle("Try Again")
@@ -428,37 +752,21 @@ class MainWindow(QMainWindow):
         self.score = score
 
         # Show the combined image to lblImgResults
-        self.showCVImage(self.combinedImage, self.lblImgResults)
+        self.showCVImage(self.compositor.rgb, self.lblImgResults, isRGB=True)
         
-        # Audio segment file
-        self.currentAudio = AudioSegment.from_file(os.path.join(self.databasePath, self.currentCategory, self.currentLevel, self.currentImage + '.mp3'))
+        # Audio segment file, decoded in the background unless it is cached
+        self.audioPlayer.load(os.path.join(self.databasePath, self.currentCategory, self.currentLevel, self.currentImage + '.mp3'))
 
         print("Calculating:", self.currentImage)
 
         # Save the score
-        userDirectory = os.path.join(self.usersPath, self.currentUser, self.currentCategory, self.currentLevel)
-        os.makedirs(userDirectory, exist_ok=True)
-
-        with open(os.path.join(userDirectory, self.currentImage + '.txt'), 'w') as f:
-            f.write(str(score))
-
-        # Check if all selectListDrawing items have been completed, except for the current one
-        allCompleted = True
-        for i in range(self.listSelectDrawing.count()):
-            item = self.listSelectDrawing.item(i)
-            currentText = item.text() if not item.text().startswith('✓') else item.text()[2:]
-            # Skip the current item
-            if currentText == self.currentImage:
-                if item.text().startswith('✓'):
-                    allCompleted = False
-                    break
-                continue
-
-            if not item.text().startswith('✓'):
-                allCompleted = False
-                break
-        
-        if allCompleted:
+        self.persistence.recordScore(self.currentUser, self.currentCategory, self.currentLevel, self.currentImage, score, True, strokes)
+
+        # The prize is won when this drawing completes the level for the first time
+        levelCompletion = self.completion.level(self.currentUser, self.currentCategory, self.currentLevel)
+        newlyCompleted = levelCompletion.markCompleted(self.currentImage)
+
+        if newlyCompleted and levelCompletion.isLevelComplete():
             # Show blocking dialog message
             # Must be modal
             msg = QMessageBox()
@@ -491,7 +799,7 @@ class MainWindow(QMainWindow):
 
             # Dispense
             if OS == OS_LINUX:
-                self.serial.write(b'dispense\n')
+                self.dispenser.dispense()
             else:
                 print("Dispensing...")
         
@@ -502,23 +810,45 @@ class MainWindow(QMainWindow):
 
         self.stackedWidget.setCurrentWidget(self.pgSuccess)
 
-        def fcnPlayAudio():
-            playback.play(self.currentAudio)
-        
-        QTimer.singleShot(10, fcnPlayAudio)
+        # Load the next drawing in the background
+        self.prefetchNextDrawing()
+
+        # Play the audio (starts once decoded if it is still loading)
+        QTimer.singleShot(10, self.audioPlayer.play)
+
 
 
 
 
 
+    # Size (width, height) of the templates and sketches
+    def canvasSize(self):
+        if self.workingSize is not None:
+            return self.workingSize
+        return self.drawingArea.width(), self.drawingArea.height()
+
+    # Convert a position on the drawingArea to canvas coordinates
+    def toCanvas(self, pos):
+        width, height = self.canvasSize()
+        if (width, height) == (self.drawingArea.width(), self.drawingArea.height()):
+            return pos.x(), pos.y()
+        return int(pos.x() * width / self.drawingArea.width()), int(pos.y() * height / self.drawingArea.height())
 
     def resetDrawingArea(self):
         # Reset the image
-        drawingAreaSize = self.drawingArea.size()
-        blankImage = np.ones((drawingAreaSize.height(), drawingAreaSize.width(), 3), np.uint8) * 255
-        self.childSketch = blankImage.copy()
-        self.currentDrawing = blankImage.copy()
-        self.combinedImage = blankImage.copy()
+        width, height = self.canvasSize()
+        self.pendingPoints = []
+        self.liveScorer = None
+
+        # Clear the buffers in place if they already match the drawing area
+        if self.compositor is not None and (self.compositor.width, self.compositor.height) == (width, height):
+            self.childSketch.fill(PAPER)
+            self.currentDrawing.fill(PAPER)
+            self.compositor.reset()
+        else:
+            self.childSketch = blankMask(width, height)
+            self.currentDrawing = blankMask(width, height)
+            self.compositor = CanvasCompositor(width, height, self.grayValue, self.strokeWidth)
 
         # Display the image on the label
         self.displayImage()
@@ -529,20 +859,17 @@ class MainWindow(QMainWindow):
         self.resetDrawingArea()
 
         # Load the image from the dataset
-        img = cv2.imread('../../images/test/test.jpg')
+        img = cv2.imread('../../images/test/test.jpg', cv2.IMREAD_GRAYSCALE)
 
-        # Convert the image to pure black and white
-        img[img < 128] = 0
-        img[img >= 128] = 255
+        # Resize the image to the size of the canvas
+        img = cv2.resize(img, self.canvasSize())
 
-        # Set the current drawing
-        self.currentDrawing = img.copy()
+        # Convert the image to pure black and white and set the current drawing
+        self.currentDrawing = binarize(img)
+        self.liveScorer = scoring.IncrementalScorer(self.currentDrawing)
 
-        # Make a copy of the current drawing
-        self.combinedImage = self.currentDrawing.copy()
-
-        # Lighten the black pixels to light gray
-        self.combinedImage[self.combinedImage == 0] = 240
+        # Compose the current drawing with the (blank) sketch
+        self.compositor.composeAll(self.currentDrawing, self.childSketch)
 
         # Display the image on the label
         self.displayImage()
@@ -550,65 +877,182 @@ class MainWindow(QMainWindow):
         self.stackedWidget.setCurrentWidget(self.pgDraw)
     
     # Function to display the image on the label
-    def displayImage(self):
-        # Resize the image to the size of the label
-        self.combinedImage = cv2.resize(self.combinedImage, (self.drawingArea.width(), self.drawingArea.height()))
-        # Convert the image to RGB format
-        qImg = cv2.cvtColor(self.combinedImage, cv2.COLOR_BGR2RGB)
-        # Convert the image to QImage format
-        qImg = QImage(qImg.data, qImg.shape[1], qImg.shape[0], QImage.Format_RGB888)
-        # Set the image to the label
-        self.drawingArea.setPixmap(QPixmap.fromImage(qImg))
+    def displayImage(self, rect=None):
+        # Repaint the whole label, or only the dirty rectangle (x0, y0, x1, y1) of the canvas
+        if rect is None:
+            self.drawingArea.update()
+            return
+
+        x0, y0, x1, y1 = rect
+        width, height = self.canvasSize()
+        if (width, height) != (self.drawingArea.width(), self.drawingArea.height()):
+            # Scale the rectangle to the label, rounding outwards
+            scaleX = self.drawingArea.width() / width
+            scaleY = self.drawingArea.height() / height
+            x0, y0 = int(x0 * scaleX), int(y0 * scaleY)
+            x1, y1 = int(x1 * scaleX) + 2, int(y1 * scaleY) + 2
+        self.drawingArea.update(x0, y0, x1 - x0, y1 - y0)
+
+    # Function to paint the drawingArea from the compositor canvas
+    @timed('paint')
+    def drawingAreaPaintEvent(self, event):
+        QLabel.paintEvent(self.drawingArea, event)
+
+        if self.compositor is None:
+            return
+
+        # Only upload the region Qt asked for, scaled from the canvas if needed
+        painter = QPainter(self.drawingArea)
+        target = event.rect()
+        if (self.compositor.width, self.compositor.height) == (self.drawingArea.width(), self.drawingArea.height()):
+            painter.drawImage(target, self.compositor.qImage, target)
+        else:
+            scaleX = self.compositor.width / self.drawingArea.width()
+            scaleY = self.compositor.height / self.drawingArea.height()
+            source = QRectF(target.x() * scaleX, target.y() * scaleY, target.width() * scaleX, target.height() * scaleY)
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            painter.drawImage(QRectF(target), self.compositor.qImage, source)
+        painter.end()
     
 
-    def showCVImage(self, imgCV, widget):
-        # Create copy
-        img = imgCV.copy()
-        # Resize the image to the size of the label
-        img = cv2.resize(img, (widget.width(), widget.height()))
-        # Convert the image to RGB format
-        qImg = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        # Convert the image to QImage format
-        qImg = QImage(qImg.data, qImg.shape[1], qImg.shape[0], QImage.Format_RGB888)
+    def showCVImage(self, imgCV, widget, isRGB=False):
+        img = np.ascontiguousarray(imgCV)
+        height, width = img.shape[:2]
+
+        # Wrap the array in a QImage without copying or converting it
+        if img.ndim == 2:
+            qImg = QImage(img.data, width, height, img.strides[0], QImage.Format_Grayscale8)
+        elif isRGB:
+            qImg = QImage(img.data, width, height, img.strides[0], QImage.Format_RGB888)
+        elif hasattr(QImage, 'Format_BGR888'):
+            qImg = QImage(img.data, width, height, img.strides[0], QImage.Format_BGR888)
+        else:
+            # Qt < 5.14 has no BGR format
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            qImg = QImage(img.data, width, height, img.strides[0], QImage.Format_RGB888)
+
+        # Only resize when the image does not already match the label
+        if (width, height) != (widget.width(), widget.height()):
+            qImg = qImg.scaled(widget.width(), widget.height(), Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
         # Set the image to the label
         widget.setPixmap(QPixmap.fromImage(qImg))
 
 
     # Function to handle mouse press event
     def mousePressEvent(self, event):
-        self.prevPos = event.pos()
+        x, y = self.toCanvas(event.pos())
+        self.pendingPoints = [(x, y)]
+        strokeIndex = None
+        if self.strokeLog is not None:
+            strokeIndex = self.strokeLog.beginStroke(self.tool, x, y)
+        self.undoStack.beginStroke(strokeIndex)
         self.isDrawing = True
+        self.frameTimer.start()
 
     # Function to handle mouse release event
     def mouseReleaseEvent(self, event):
+        # Draw whatever is left of the stroke before stopping
+        self.flushStroke()
+        self.undoStack.endStroke(self.childSketch)
+        self.frameTimer.stop()
         self.isDrawing = False
+        self.pendingPoints = []
 
     # Function to handle mouse move event
+    @timed('mouseMoveEvent')
     def mouseMoveEvent(self, event):
         if self.isDrawing:
-            # Get the current position of the mouse
-            currentPos = event.pos()
-            # print(self.prevPos.x(), self.prevPos.y(), currentPos.x(), currentPos.y())
-            # Draw a line from the previous position to the current position
-            if self.tool == 'pencil':
-                cv2.line(self.childSketch, (self.prevPos.x(), self.prevPos.y()), (currentPos.x(), currentPos.y()), (0, 0, 0), 8)
-            elif self.tool == 'eraser':
-                cv2.line(self.childSketch, (self.prevPos.x(), self.prevPos.y()), (currentPos.x(), currentPos.y()), (255, 255, 255), 8)
-            # Update the previous position
-            self.prevPos = currentPos
-
-            # Combine the current drawing and the child sketch
-            self.combinedImage = self.currentDrawing.copy()
-            # Lighten the black pixels to light gray
-            self.combinedImage[self.combinedImage == 0] = self.grayValue
-
-            self.combinedImage[:,:,0][self.childSketch[:,:,0] == 0] = 255
-            self.combinedImage[:,:,1][self.childSketch[:,:,0] == 0] = 0
-            self.combinedImage[:,:,2][self.childSketch[:,:,0] == 0] = 0
-            
+            # Only record the point, the frame timer draws it
+            x, y = self.toCanvas(event.pos())
+            self.pendingPoints.append((x, y))
+            if self.strokeLog is not None:
+                self.strokeLog.addPoint(x, y)
+
+    # Function to rasterize the pending points and repaint, called once per frame
+    @timed('flushStroke')
+    def flushStroke(self):
+        if len(self.pendingPoints) < 2:
+            return
+
+        points = self.pendingPoints
+        # Keep the last point as the start of the next batch
+        self.pendingPoints = [points[-1]]
+
+        # Region touched by the new strokes
+        rect = self.compositor.pointsRect(points)
+        if rect is None:
+            return
+
+        # Score of the region before the new strokes
+        if self.liveScorer is not None:
+            scoreBefore = self.liveScorer.measure(self.childSketch, rect)
+
+        # Keep the tiles under the new strokes for undo
+        self.undoStack.saveTiles(self.childSketch, rect)
+
+        # Draw the polyline through all points received since the last frame
+        polyline = [np.array(points, np.int32)]
+        if self.tool == 'pencil':
+            cv2.polylines(self.childSketch, polyline, False, INK, self.strokeWidth)
+        elif self.tool == 'eraser':
+            cv2.polylines(self.childSketch, polyline, False, PAPER, self.strokeWidth)
+
+        # Count only the pixels the new strokes covered (or erased)
+        if self.liveScorer is not None:
+            self.liveScorer.update(scoreBefore, self.liveScorer.measure(self.childSketch, rect))
+
+        # Combine the current drawing and the child sketch, only around the new strokes
+        self.compositor.composeRegion(self.currentDrawing, self.childSketch, rect)
+
+        # Display the dirty rectangle on the label
+        self.displayImage(rect)
+        self.showLiveScore()
+
+    def undoStroke(self):
+        result = self.undoStack.undo(self.childSketch)
+        if result is None:
+            return
+
+        strokeIndex, rect = result
+        if self.strokeLog is not None and strokeIndex is not None:
+            self.strokeLog.logUndo(strokeIndex)
+        self.refreshSketchRegion(rect)
+
+    def redoStroke(self):
+        result = self.undoStack.redo(self.childSketch)
+        if result is None:
+            return
 
-            # Display the image on the label
-            self.displayImage()
+        strokeIndex, rect = result
+        if self.strokeLog is not None and strokeIndex is not None:
+            self.strokeLog.logRedo(strokeIndex)
+        self.refreshSketchRegion(rect)
+
+    # Update the live score and the display after the sketch changed inside rect
+    def refreshSketchRegion(self, rect):
+        # Undo is rare, so recount the whole sketch instead of tracking the swapped tiles
+        if self.liveScorer is not None:
+            self.liveScorer.recount(self.childSketch)
+
+        self.compositor.composeRegion(self.currentDrawing, self.childSketch, rect)
+        self.displayImage(rect)
+        self.showLiveScore()
+
+    # Score of the sketch so far, for showing live progress
+    def liveScore(self):
+        if self.liveScorer is None:
+            return 0
+        return self.liveScorer.score()
+
+    # Show the live score, green once it passes; the label is only touched when the shown value changes
+    def showLiveScore(self):
+        score = int(self.liveScore())
+        if score == self.shownLiveScore:
+            return
+        self.shownLiveScore = score
+        self.lblLiveScore.setText(f'Score: {score}')
+        self.lblLiveScore.setStyleSheet('color: green;' if score >= self.scoreThresh else '')
     
 
 
@@ -692,8 +1136,13 @@ class MainWindow(QMainWindow):
         category = selectedCategory.text()
         level = selectedLevel.text()
 
-        # Delete the directory
-        shutil.rmtree(os.path.join(self.databasePath, category, level))
+        # Delete the directory in the background
+        self.tasks.run(shutil.rmtree, os.path.join(self.databasePath, category, level),
+            onResult=lambda _: self.levelDeleted(category),
+            onError=lambda e: self.showTaskError("Could not delete the level.", e))
+
+    def levelDeleted(self, category):
+        self.catalog.rescanCategory(category)
 
         # Refresh the manage page
         self.refreshManageLevels()
@@ -735,7 +1184,7 @@ class MainWindow(QMainWindow):
         
         # - Check if the name already exists
         category = selectedCategory.text()
-        if newLevel in os.listdir(os.path.join(self.databasePath, category)):
+        if newLevel in self.catalog.levels(category):
             msg = QMessageBox()
             msg.setWindowTitle("Error")
             msg.setText("Level already exists.")
@@ -744,6 +1193,7 @@ class MainWindow(QMainWindow):
         
         # Create the directory
         os.makedirs(os.path.join(self.databasePath, category, newLevel), exist_ok=True)
+        self.catalog.rescanCategory(category)
 
         # Refresh the manage page
         self.refreshManageLevels()
@@ -782,8 +1232,13 @@ class MainWindow(QMainWindow):
         # Delete the category
         category = selectedCategory.text()
 
-        # Delete the directory
-        shutil.rmtree(os.path.join(self.databasePath, category))
+        # Delete the directory in the background
+        self.tasks.run(shutil.rmtree, os.path.join(self.databasePath, category),
+            onResult=lambda _: self.categoryDeleted(),
+            onError=lambda e: self.showTaskError("Could not delete the category.", e))
+
+    def categoryDeleted(self):
+        self.catalog.rescanRoot()
 
         # Refresh the manage page
         self.refreshManageCategories()
@@ -816,7 +1271,7 @@ class MainWindow(QMainWindow):
             return
         
         # - Check if the name already exists
-        if newCategory in os.listdir(self.databasePath):
+        if newCategory in self.catalog.categories():
             msg = QMessageBox()
             msg.setWindowTitle("Error")
             msg.setText("Category already exists.")
@@ -825,6 +1280,7 @@ class MainWindow(QMainWindow):
         
         # Create the directory
         os.makedirs(os.path.join(self.databasePath, newCategory), exist_ok=True)
+        self.catalog.rescanRoot()
 
         # Refresh the manage page
         self.refreshManageCategories()
@@ -873,7 +1329,7 @@ class MainWindow(QMainWindow):
         level = selectedLevel.text()
 
         # Check if the name already exists
-        if imageName + '.jpg' in os.listdir(os.path.join(self.databasePath, category, level)):
+        if self.catalog.drawing(category, level, imageName) is not None:
             msg = QMessageBox()
             msg.setWindowTitle("Error")
             msg.setText("Image already exists.")
@@ -897,15 +1353,31 @@ class MainWindow(QMainWindow):
             return
         
         mp3Files = fileDialog.selectedFiles()
-        
 
+        # Copy (and transcode) in the background
+        self.tasks.run(self.copyDrawingFiles, files, mp3Files, os.path.join(self.databasePath, category, level), imageName,
+            onResult=lambda _: self.drawingAdded(category, level),
+            onError=lambda e: self.showTaskError("Could not add the image.", e))
+
+    # Runs on a worker thread
+    def copyDrawingFiles(self, files, mp3Files, levelPath, imageName):
         for file in files:
             # Copy the file to the database
-            shutil.copy(file, os.path.join(self.databasePath, category, level, imageName + '.jpg'))
+            shutil.copy(file, os.path.join(levelPath, imageName + '.jpg'))
         
         for mp3File in mp3Files:
             # Copy the file to the database
-            shutil.copy(mp3File, os.path.join(self.databasePath, category, level, imageName + '.mp3'))
+            mp3Path = os.path.join(levelPath, imageName + '.mp3')
+            shutil.copy(mp3File, mp3Path)
+
+            # Decode it once now, so the kiosk plays the raw WAV without ffmpeg
+            try:
+                writeWavSidecar(mp3Path)
+            except Exception as e:
+                print("Could not transcode audio:", mp3Path, e)
+
+    def drawingAdded(self, category, level):
+        self.catalog.rescanLevel(category, level)
 
         # Refresh the manage page
         self.refreshManageImages()
@@ -948,8 +1420,23 @@ class MainWindow(QMainWindow):
         level = selectedLevel.text()
         image = selectedImage.text()
 
+        # Delete the files in the background
+        self.tasks.run(self.removeDrawingFiles, os.path.join(self.databasePath, category, level), image,
+            onResult=lambda _: self.drawingDeleted(category, level),
+            onError=lambda e: self.showTaskError("Could not delete the image.", e))
+
+    # Runs on a worker thread
+    def removeDrawingFiles(self, levelPath, image):
         # Delete the file
-        os.remove(os.path.join(self.databasePath, category, level, image + '.jpg'))
+        os.remove(os.path.join(levelPath, image + '.jpg'))
+
+        # Delete the decoded audio sidecar, the mp3 is kept as before
+        wavPath = wavSidecarPath(os.path.join(levelPath, image + '.mp3'))
+        if os.path.exists(wavPath):
+            os.remove(wavPath)
+
+    def drawingDeleted(self, category, level):
+        self.catalog.rescanLevel(category, level)
 
         # Refresh the manage page
         self.refreshManageImages()
@@ -976,10 +1463,8 @@ class MainWindow(QMainWindow):
         # Clear instructions
         self.editInstructions.setPlainText('')
 
-        listOfCategories = os.listdir(self.databasePath)
-
-        # Sort the list of categories in ascending order
-        listOfCategories.sort()
+        # Sorted list of categories in ascending order
+        listOfCategories = self.catalog.categories()
 
         # Populate the list of categories
         self.listCategories.clear()
@@ -1009,12 +1494,7 @@ class MainWindow(QMainWindow):
 
         category = selectedCategory.text()
 
-        try:
-            listOfLevels = os.listdir(os.path.join(self.databasePath, category))
-            # Sort
-            listOfLevels.sort()
-        except:
-            return
+        listOfLevels = self.catalog.levels(category)
 
         # Populate the list of levels
         self.listLevels.clear()
@@ -1041,30 +1521,24 @@ class MainWindow(QMainWindow):
         category = selectedCategory.text()
         level = selectedLevel.text()
         
-        try:
-            # Get the list of jpg images in the directory
-            listOfImages = [f[0:-4] for f in os.listdir(os.path.join(self.databasePath, category, level)) if f.endswith('.jpg')]
-            # Sort
-            listOfImages.sort()
-        except:
+        if self.catalog.level(category, level) is None:
             return
 
+        # Get the sorted list of images in the level
+        listOfImages = self.catalog.drawings(category, level)
+
         # Populate the list of images
         self.listImages.clear()
         for image in listOfImages:
             self.listImages.addItem(image)
 
-        if not os.path.exists(os.path.join(self.databasePath, category, level, 'instructions.txt')):
-            with open(os.path.join(self.databasePath, category, level, 'instructions.txt'), 'w') as f:
-                f.write('')
-        
-        with open(os.path.join(self.databasePath, category, level, 'instructions.txt'), 'r') as f:
-            instructions = f.read()
-        
-        self.editInstructions.setPlainText(instructions)
+        self.editInstructions.setPlainText(self.catalog.instructions(category, level))
     
 
     def manageShowImage(self):
+        # Drop the image still being read for the previous selection
+        self.previewPath = None
+
         selectedCategory = self.listCategories.currentItem()
         selectedLevel = self.listLevels.currentItem()
         selectedImage = self.listImages.currentItem()
@@ -1081,14 +1555,25 @@ class MainWindow(QMainWindow):
             self.showWhiteImageOnDrawingPreview()
             return
 
-        img = cv2.imread(os.path.join(self.databasePath, category, level, image + '.jpg'))
+        # Read the image in the background, and show it if it is still selected by then
+        path = os.path.join(self.databasePath, category, level, image + '.jpg')
+        self.previewPath = path
+        self.tasks.run(cv2.imread, path, busy=False, onResult=lambda img: self.showPreviewImage(path, img))
 
-        self.showCVImage(img, self.lblPreviewDrawing)
+    def showPreviewImage(self, path, img):
+        if path != self.previewPath:
+            return
+
+        if img is None:
+            self.showWhiteImageOnDrawingPreview()
+        else:
+            self.showCVImage(img, self.lblPreviewDrawing)
 
     
     def showWhiteImageOnDrawingPreview(self):
-        blankImage = np.ones((self.lblPreviewDrawing.height(), self.lblPreviewDrawing.width(), 3), np.uint8) * 255
-        self.showCVImage(blankImage, self.lblPreviewDrawing)
+        blankPixmap = QPixmap(self.lblPreviewDrawing.width(), self.lblPreviewDrawing.height())
+        blankPixmap.fill(Qt.white)
+        self.lblPreviewDrawing.setPixmap(blankPixmap)
 
     def saveInstructions(self):
         selectedCategory = self.listCategories.currentItem()
@@ -1102,6 +1587,7 @@ class MainWindow(QMainWindow):
 
         with open(os.path.join(self.databasePath, category, level, 'instructions.txt'), 'w') as f:
             f.write(self.editInstructions.toPlainText())
+        self.catalog.setInstructions(category, level, self.editInstructions.toPlainText())
 
         msg = QMessageBox()
         msg.setWindowTitle("Success")
@@ -1125,9 +1611,7 @@ class MainWindow(QMainWindow):
         
         category = selectedCategory.text()
 
-        listOfLevels = os.listdir(os.path.join(self.databasePath, category))
-        # Sort
-        listOfLevels.sort()
+        listOfLevels = self.catalog.levels(category)
 
         # Populate the list of levels
         self.listSelectLevel.clear()
@@ -1145,14 +1629,13 @@ class MainWindow(QMainWindow):
         category = selectedCategory.text()
         level = selectedLevel.text()
 
-        # Get the list of jpg images in the directory
-        try:
-            listOfImages = [f for f in os.listdir(os.path.join(self.databasePath, category, level)) if f.endswith('.jpg')]
-            # Sort
-            listOfImages.sort()
-        except:
+        if self.catalog.level(category, level) is None:
             return
 
+        # Sorted images of the level and the ones the user already completed
+        levelCompletion = self.completion.level(self.currentUser, category, level)
+        listOfImages = levelCompletion.drawings
+
         # Unselect the selected items
         self.listSelectDrawing.clearSelection()
         # Populate the list of images
@@ -1160,10 +1643,9 @@ class MainWindow(QMainWindow):
 
         for image in listOfImages:
             prepend = ''
-            userDirectory = os.path.join(self.usersPath, self.currentUser, category, level)
-            if os.path.exists(os.path.join(userDirectory, image[0:-4] + '.txt')):
+            if levelCompletion.isCompleted(image):
                 prepend = '✓ '
-            self.listSelectDrawing.addItem(prepend + image[0:-4])
+            self.listSelectDrawing.addItem(prepend + image)
     
     def selectProceed(self):
         selectedCategory = self.listSelectCategory.currentItem()
@@ -1185,8 +1667,7 @@ class MainWindow(QMainWindow):
             self.currentImage = image
 
         # Load instructions
-        with open(os.path.join(self.databasePath, category, level, 'instructions.txt'), 'r') as f:
-            instructions = f.read()
+        instructions = self.catalog.instructions(category, level)
         
         # Display instructions
         self.lblInstructions.setText(instructions)
@@ -1203,46 +1684,101 @@ class MainWindow(QMainWindow):
         if selectedCategory is None or selectedLevel is None or selectedImage is None:
             return
 
+        self.startDrawingTime = time.perf_counter()
         self.resetDrawingArea()
 
-        img = cv2.imread(os.path.join(self.databasePath, self.currentCategory, self.currentLevel, self.currentImage + '.jpg'))
+        # Get the black and white template at the size of the canvas, in the background
+        width, height = self.canvasSize()
+        self.currentTemplatePath = os.path.join(self.databasePath, self.currentCategory, self.currentLevel, self.currentImage + '.jpg')
+        path = self.currentTemplatePath
+        self.tasks.run(self.loadTemplate, path, width, height,
+            onResult=lambda result: self.templateLoaded(path, *result),
+            onError=lambda e: self.templateLoadFailed(path, e))
+
+    # Runs on a worker thread: the template mask and, when scoring with a tolerance, its distance map
+    @timed('loadTemplate')
+    def loadTemplate(self, path, width, height):
+        template = self.templateCache.get(path, width, height)
+        distance = None
+        if self.scoreTolerance > 0:
+            distance = self.templateCache.getDistance(path, width, height)
+        return template, distance
+
+    # The template could not be read (e.g. removed meanwhile): back to the level selection
+    def templateLoadFailed(self, path, error):
+        # Another drawing was started meanwhile
+        if path != self.currentTemplatePath:
+            return
+
+        self.audioPlayer.stop()
+        self.showTaskError("Could not load the drawing.", error)
+        self.showLevelSelectionPage()
+
+    def templateLoaded(self, path, template, distance):
+        # Another drawing was started meanwhile
+        if path != self.currentTemplatePath:
+            return
 
-        # Resize the image to the size of the label
-        img = cv2.resize(img, (self.drawingArea.width(), self.drawingArea.height()))
+        width, height = self.canvasSize()
 
-        # Convert the image to pure black and white
-        img[img < 128] = 0
-        img[img >= 128] = 255
+        # Set the current drawing (the cached template is shared, so copy it)
+        np.copyto(self.currentDrawing, template)
 
-        # Set the current drawing
-        self.currentDrawing = img.copy()
+        # Start the live score of the (blank) sketch
+        if distance is not None:
+            self.liveScorer = scoring.IncrementalScorer(self.currentDrawing, distance, self.scoreTolerance)
+        else:
+            self.liveScorer = scoring.IncrementalScorer(self.currentDrawing)
 
-        # Make a copy of the current drawing
-        self.combinedImage = self.currentDrawing.copy()
+        # Start recording the strokes of this attempt
+        self.strokeLog = StrokeLog(width, height, self.strokeWidth)
+        self.undoStack.clear()
 
-        # Lighten the black pixels to light gray
-        self.combinedImage[self.combinedImage == 0] = self.grayValue
+        # Compose the current drawing with the (blank) sketch
+        self.compositor.composeAll(self.currentDrawing, self.childSketch)
 
         # Display the image on the label
         self.displayImage()
+        self.showLiveScore()
 
         # Set the tool to pencil
         self.setToolToPencil()
 
         self.stackedWidget.setCurrentWidget(self.pgDraw)
+        instrumentation.record('startDrawing', time.perf_counter() - self.startDrawingTime)
     
     def backFromDrawing(self):
+        self.audioPlayer.stop()
         self.showLevelSelectionPage()
 
+    def prefetchNextDrawing(self):
+        nextImage = self.completion.level(self.currentUser, self.currentCategory, self.currentLevel).nextDrawing(self.currentImage)
+        if nextImage is None:
+            return
+
+        levelPath = os.path.join(self.databasePath, self.currentCategory, self.currentLevel)
+
+        self.tasks.run(self.prefetchDrawing,
+            os.path.join(levelPath, nextImage + '.jpg'),
+            os.path.join(levelPath, nextImage + '.mp3'),
+            *self.canvasSize(),
+            busy=False, onError=lambda e: print("Prefetch failed:", e))
+
+    # Runs on a worker thread: warm the template cache (and distance map) and decode the audio
+    def prefetchDrawing(self, imagePath, audioPath, width, height):
+        if self.scoreTolerance > 0:
+            self.templateCache.getDistance(imagePath, width, height)
+        else:
+            self.templateCache.get(imagePath, width, height)
+        if os.path.exists(audioPath):
+            self.audioCache.get(audioPath)
+
     def continueAfterSuccess(self, score):
+        # Cut the feedback audio of the finished drawing
+        self.audioPlayer.stop()
+
         # Find the current row based from the current image
-        currentIndex = -1
-        for i in range(self.listSelectDrawing.count()):
-            item = self.listSelectDrawing.item(i)
-            currentText = item.text() if not item.text().startswith('✓') else item.text()[2:]
-            if currentText == self.currentImage:
-                currentIndex = i
-                break
+        currentIndex = self.completion.level(self.currentUser, self.currentCategory, self.currentLevel).row(self.currentImage)
 
         next_item = self.listSelectDrawing.item(currentIndex + 1) if currentIndex + 1 < self.listSelectDrawing.count() else None
 
@@ -1274,9 +1810,7 @@ class MainWindow(QMainWindow):
         # Clear the list of images
         self.listSelectDrawing.clear()
 
-        listOfCategories = os.listdir(self.databasePath)
-        # Sort
-        listOfCategories.sort()
+        listOfCategories = self.catalog.categories()
 
         # Populate the list of categories
         self.listSelectCategory.clear()
@@ -1295,6 +1829,10 @@ class MainWindow(QMainWindow):
         if response != QMessageBox.Yes:
             return
         
+        # Commit all queued progress and sync it to disk before powering off
+        self.persistence.flush()
+        self.progressStore.checkpoint()
+
         if OS == OS_LINUX:
             os.system("sudo shutdown -h now")
         else:
@@ -1305,6 +1843,7 @@ class MainWindow(QMainWindow):
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = MainWindow()
+    startupTiming.mark('create window')
 
     if OS == OS_LINUX:
         window.showFullScreen()
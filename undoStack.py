@@ -0,0 +1,117 @@
+from collections import deque
+import numpy as np
+
+
+# Size of the square tiles saved per stroke, in pixels
+TILE_SIZE = 64
+
+
+# Undo / redo of strokes on the child sketch
+# Each stroke (press -> release) stores only the tiles it changed, as they were before it,
+# so memory grows with the area of a stroke and not with the canvas size
+# The oldest strokes are dropped when the stack holds more than maxBytes of tiles
+class UndoStack:
+    def __init__(self, maxBytes=8 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.undoEntries = deque()
+        self.redoEntries = []
+        self.bytes = 0
+
+        # Tiles saved for the stroke in progress: {(tileY, tileX): tile before the stroke}
+        self.currentTiles = None
+        self.currentTag = None
+
+    def clear(self):
+        self.undoEntries.clear()
+        self.redoEntries = []
+        self.bytes = 0
+        self.currentTiles = None
+
+    def canUndo(self):
+        return len(self.undoEntries) > 0
+
+    def canRedo(self):
+        return len(self.redoEntries) > 0
+
+    # tag is returned by undo() and redo(), e.g. the index of the stroke in the stroke log
+    def beginStroke(self, tag=None):
+        self.currentTiles = {}
+        self.currentTag = tag
+
+    # Save the tiles under rect (x0, y0, x1, y1) before the stroke draws in it
+    def saveTiles(self, sketch, rect):
+        if self.currentTiles is None:
+            return
+
+        x0, y0, x1, y1 = rect
+        for tileY in range(y0 // TILE_SIZE, (y1 - 1) // TILE_SIZE + 1):
+            for tileX in range(x0 // TILE_SIZE, (x1 - 1) // TILE_SIZE + 1):
+                if (tileY, tileX) not in self.currentTiles:
+                    self.currentTiles[(tileY, tileX)] = sketch[self.tileSlice(tileY, tileX)].copy()
+
+    def endStroke(self, sketch):
+        tiles = self.currentTiles
+        self.currentTiles = None
+        if not tiles:
+            return
+
+        # Keep only the tiles the stroke actually changed
+        entry = [(tileY, tileX, before) for (tileY, tileX), before in tiles.items()
+            if not np.array_equal(before, sketch[self.tileSlice(tileY, tileX)])]
+        if not entry:
+            return
+
+        self.undoEntries.append((self.currentTag, entry))
+        self.bytes += self.entryBytes(entry)
+
+        # A new stroke cannot be followed by the strokes that were undone before it
+        self.redoEntries = []
+
+        # Drop the oldest strokes over the memory cap
+        while self.bytes > self.maxBytes and len(self.undoEntries) > 1:
+            self.bytes -= self.entryBytes(self.undoEntries.popleft()[1])
+
+    # Undo the last stroke; returns (tag, changed rect) or None
+    def undo(self, sketch):
+        if not self.undoEntries:
+            return None
+
+        tag, entry = self.undoEntries.pop()
+        self.bytes -= self.entryBytes(entry)
+        self.redoEntries.append((tag, self.swapTiles(sketch, entry)))
+        return tag, self.entryRect(entry, sketch)
+
+    # Redo the last undone stroke; returns (tag, changed rect) or None
+    def redo(self, sketch):
+        if not self.redoEntries:
+            return None
+
+        tag, entry = self.redoEntries.pop()
+        entry = self.swapTiles(sketch, entry)
+        self.undoEntries.append((tag, entry))
+        self.bytes += self.entryBytes(entry)
+        return tag, self.entryRect(entry, sketch)
+
+    # Put the saved tiles back and return the tiles they replaced
+    def swapTiles(self, sketch, entry):
+        swapped = []
+        for tileY, tileX, tile in entry:
+            tileSlice = self.tileSlice(tileY, tileX)
+            swapped.append((tileY, tileX, sketch[tileSlice].copy()))
+            sketch[tileSlice] = tile
+        return swapped
+
+    def tileSlice(self, tileY, tileX):
+        return (slice(tileY * TILE_SIZE, (tileY + 1) * TILE_SIZE), slice(tileX * TILE_SIZE, (tileX + 1) * TILE_SIZE))
+
+    # Bounding rect (x0, y0, x1, y1) of the tiles of an entry, clipped to the sketch
+    def entryRect(self, entry, sketch):
+        height, width = sketch.shape[:2]
+        x0 = min(tileX for _, tileX, _ in entry) * TILE_SIZE
+        y0 = min(tileY for tileY, _, _ in entry) * TILE_SIZE
+        x1 = min((max(tileX for _, tileX, _ in entry) + 1) * TILE_SIZE, width)
+        y1 = min((max(tileY for tileY, _, _ in entry) + 1) * TILE_SIZE, height)
+        return (x0, y0, x1, y1)
+
+    def entryBytes(self, entry):
+        return sum(tile.nbytes for _, _, tile in entry)